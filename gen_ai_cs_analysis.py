@@ -7,9 +7,20 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
+import argparse
+from functools import partial
 from jinja2 import Template
-import base64
-from io import BytesIO
+from gen_ai_cs_images import ENCODE_WORKERS, MAX_PENDING_ENCODES, ImageEncoder, artifacts_exist
+from gen_ai_cs_cube import (build_cube, cube_counts, cube_companies, cube_industries, partial_cube,
+                            merge_partial_cubes, pair_tables, merge_pair_tables, category_lift,
+                            cube_slice, cube_from_store, store_pair_tables)
+from gen_ai_cs_sketch import SKETCH_RELATIVE_ERROR
+from gen_ai_cs_preprocess import DATA_PATH, STORE_PATH, load_data, load_preprocessed, as_csv_types, write_store
+from gen_ai_cs_pipeline import STAGE_WORKERS, Stage, process_cores, run_pipeline
+from gen_ai_cs_shared import SharedDataset
+from gen_ai_cs_svg import wrap_label, radar_svg, save_svg
+from gen_ai_cs_similarity import profile_table, merge_profile_tables, store_profile_table, company_peers
+from gen_ai_cs_combinations import frequent_combinations
 
 # Set the color palette based on user's PPT colors
 color_palette = [
@@ -20,77 +31,86 @@ color_palette = [
     (220/255, 175/255, 225/255)  # Very Light Purple
 ]
 
-# Load the data
-df = pd.read_csv('tableau_ready_data.csv')
+# Enhanced colors with higher contrast for the ratio comparison charts
+FOCUS_COLOR = (80/255, 10/255, 140/255)  # Darker purple for the focus industry
+OTHER_COLOR = (220/255, 70/255, 160/255)  # Brighter pink for Other Industries
 
-# Create folder for images if it doesn't exist
-os.makedirs('gen_ai_cs_viz', exist_ok=True)
+# Ways of drawing the spider charts: matplotlib rasters, or SVG written directly
+RADAR_RENDERERS = ['matplotlib', 'svg']
+
+# Category dimensions and the pairs of them compared in heatmaps
+CATEGORY_NUMS = [1, 2, 3, 4]
+CATEGORY_PAIRS = [(i, j) for i in CATEGORY_NUMS for j in CATEGORY_NUMS if i < j]
+
+# Heatmaps with more cells than this are drawn as a single image without cell annotations
+HEATMAP_ANNOTATION_MAX_CELLS = 400
+
+# Maximum number of tick labels drawn along each heatmap axis
+HEATMAP_MAX_TICK_LABELS = 40
+
+# Industry the deep-dive report focuses on unless others are requested
+DEFAULT_FOCUS_INDUSTRY = 'Telco'
+
+# File-name friendly key for an industry
+def industry_key(industry):
+    return industry.replace(' ', '_').replace('&', 'and')
 
 # Basic statistics function
-def get_basic_stats(df):
-    """Generate basic statistics from the dataset"""
-    # Separate Telco and non-Telco data
-    telco_df = df[df['Industry'] == 'Telco']
-    non_telco_df = df[df['Industry'] != 'Telco']
-    
-    # Get unique companies for each industry
-    industry_company_counts = non_telco_df[['Industry', 'Company']].drop_duplicates()
-    industry_counts = industry_company_counts['Industry'].value_counts().reset_index()
+def get_basic_stats(cube, focus_industry=DEFAULT_FOCUS_INDUSTRY):
+    """Generate basic statistics from the aggregation cube"""
+    # Get unique companies for each industry, with the focus industry at the top
+    industry_counts = cube['companies'].rename_axis('Industry').reset_index()
     industry_counts.columns = ['Industry', 'Count']
-    
-    # Add Telco counts separately at the top
-    telco_company_count = telco_df[['Industry', 'Company']].drop_duplicates()['Industry'].value_counts().reset_index()
-    telco_company_count.columns = ['Industry', 'Count']
-    industry_counts = pd.concat([telco_company_count, industry_counts], ignore_index=True)
+    is_focus = industry_counts['Industry'] == focus_industry
+    industry_counts = pd.concat([industry_counts[is_focus], industry_counts[~is_focus]], ignore_index=True)
     
     # Get unique contact parties
-    contact_party_company_counts = df[['Contact_Party', 'Company']].drop_duplicates()
-    contact_party_counts = contact_party_company_counts['Contact_Party'].value_counts().reset_index()
+    contact_party_counts = cube_counts(cube, 'Contact_Party').sort_values(ascending=False).reset_index()
     contact_party_counts.columns = ['Contact Party', 'Count']
     
     # Get unique contact types
-    contact_type_company_counts = df[['Contact_Type', 'Company']].drop_duplicates()
-    contact_type_counts = contact_type_company_counts['Contact_Type'].value_counts().reset_index()
+    contact_type_counts = cube_counts(cube, 'Contact_Type').sort_values(ascending=False).reset_index()
     contact_type_counts.columns = ['Contact Type', 'Count']
     
     return {
         'industry_counts': industry_counts,
         'contact_party_counts': contact_party_counts,
         'contact_type_counts': contact_type_counts,
-        'telco_count': telco_company_count['Count'].iloc[0] if not telco_company_count.empty else 0
+        'focus_count': cube_companies(cube, industries=[focus_industry])
     }
 
-# Convert matplotlib figure to base64 for embedding in HTML
-def fig_to_base64(fig):
-    buf = BytesIO()
-    fig.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close(fig)
-    return img_str
-
-# Function to create spider/radar chart for a given dataframe and category
-def create_spider_chart(data, category_col, title, filename=None, include_title=False):
-    """Create a spider/radar chart for the given category"""
-    # Get all possible category values from the data
-    all_cat_values = sorted(data[category_col].unique())
-    
-    # Calculate the frequency of each category value, only counting unique companies
-    cat_company_counts = data[['Company', category_col]].drop_duplicates()
-    cat_counts_series = cat_company_counts[category_col].value_counts()
-    
-    # Create a DataFrame with all possible categories, filling missing values with 0
-    cat_counts = pd.DataFrame({'Category': all_cat_values})
-    cat_counts['Count'] = cat_counts['Category'].map(lambda x: cat_counts_series.get(x, 0))
+# Encodes charts in the background while the next one is being drawn, created on first use
+encoder = None
+
+# Encoder of the current process
+def chart_encoder():
+    """Return the encoder, with threads for this process's share of the cores only, since in a
+    pool the other workers keep the remaining cores busy"""
+    global encoder
+    if encoder is None:
+        workers = min(process_cores(), ENCODE_WORKERS)
+        encoder = ImageEncoder(workers=workers, max_pending=min(MAX_PENDING_ENCODES, workers + 1))
+    return encoder
+
+# Write a matplotlib figure to the artifact store and release it
+def save_figure(fig, filename, quantize=True):
+    """Rasterize the figure, queue it for encoding and return its artifact reference"""
+    return chart_encoder().submit(fig, filename, quantize)
+
+# Spokes of a spider chart from the distinct-company counts of a category
+def spider_counts(cat_counts_series, label_mapping):
+    """Return one row per category value present in the counts, with its count and label"""
+    cat_counts = pd.DataFrame({'Category': sorted(cat_counts_series.index)})
+    cat_counts['Count'] = cat_counts['Category'].map(cat_counts_series)
     
     # Get category labels if available
-    if f'{category_col} Label' in data.columns:
-        # Get all unique category values and their labels
-        label_mapping = data[[category_col, f'{category_col} Label']].drop_duplicates()
-        label_mapping = dict(zip(label_mapping[category_col], label_mapping[f'{category_col} Label']))
-        cat_counts['Label'] = cat_counts['Category'].map(label_mapping)
-    else:
-        cat_counts['Label'] = cat_counts['Category']
+    cat_counts['Label'] = cat_counts['Category'].map(lambda x: label_mapping.get(x, x))
+    return cat_counts
+
+# Function to create spider/radar chart from the distinct-company counts of a category
+def create_spider_chart(cat_counts_series, label_mapping, title, include_title=False):
+    """Create a spider/radar chart for the given category counts (indexed by category value)"""
+    cat_counts = spider_counts(cat_counts_series, label_mapping)
     
     # Create radar chart
     fig = plt.figure(figsize=(14, 14))  # Further increased figure size
@@ -105,21 +125,7 @@ def create_spider_chart(data, category_col, title, filename=None, include_title=
     angles = angles + [angles[0]]
     
     # Process labels for line breaks
-    processed_labels = []
-    for label in cat_counts['Label'].iloc[:-1]:
-        # Add newline for labels containing "&" or "and"
-        if ' & ' in label:
-            label = label.replace(' & ', '\n& ')
-        elif ' and ' in label:
-            label = label.replace(' and ', '\nand ')
-        # Handle long labels (more than 20 chars)
-        elif len(label) > 20:
-            words = label.split()
-            mid_point = len(words) // 2
-            first_half = ' '.join(words[:mid_point])
-            second_half = ' '.join(words[mid_point:])
-            label = f"{first_half}\n{second_half}"
-        processed_labels.append(label)
+    processed_labels = [wrap_label(label) for label in cat_counts['Label'].iloc[:-1]]
     
     # Plot data
     ax.plot(angles, cat_counts['Count'], 'o-', color=color_palette[0], linewidth=2, label='Count')
@@ -145,51 +151,44 @@ def create_spider_chart(data, category_col, title, filename=None, include_title=
     # Draw circle at center for better visualization
     ax.grid(True)
     
-    # Save if filename provided
-    if filename:
-        plt.tight_layout()
-        plt.savefig(f'gen_ai_cs_viz/{filename}.png', dpi=300, bbox_inches='tight')
+    plt.tight_layout()
         
     return fig
 
-# Function to create ratio-based spider chart comparing Telco and other industries
-def create_ratio_spider_chart(df, category_col, title, filename=None):
-    """Create a ratio-based spider chart comparing Telco vs. other industries"""
-    # Split data into Telco and non-Telco
-    telco_df = df[df['Industry'] == 'Telco']
-    non_telco_df = df[df['Industry'] != 'Telco']
-    
+# Share of companies using each category value, in the focus industry and in all others
+def category_ratios(cube, category_col, focus_industry=DEFAULT_FOCUS_INDUSTRY):
+    """Return one row per category value with the focus and other industries' ratios and its label"""
     # Get all possible category values from the data
-    all_cat_values = sorted(df[category_col].unique())
-    
-    # Calculate ratios for Telco
-    telco_company_counts = telco_df[['Company', category_col]].drop_duplicates()
-    telco_total = len(telco_company_counts['Company'].unique())
-    telco_counts_series = telco_company_counts[category_col].value_counts()
-    telco_ratios = {cat: telco_counts_series.get(cat, 0) / telco_total if telco_total > 0 else 0 
-                   for cat in all_cat_values}
-    
-    # Calculate ratios for non-Telco
-    non_telco_company_counts = non_telco_df[['Company', category_col]].drop_duplicates()
-    non_telco_total = len(non_telco_company_counts['Company'].unique())
-    non_telco_counts_series = non_telco_company_counts[category_col].value_counts()
-    non_telco_ratios = {cat: non_telco_counts_series.get(cat, 0) / non_telco_total if non_telco_total > 0 else 0 
-                       for cat in all_cat_values}
+    all_cat_values = list(cube_counts(cube, category_col).index)
+    
+    # Calculate ratios for the focus industry
+    focus_total = cube_companies(cube, industries=[focus_industry])
+    focus_counts_series = cube_counts(cube, category_col, industries=[focus_industry])
+    focus_ratios = {cat: focus_counts_series.get(cat, 0) / focus_total if focus_total > 0 else 0 
+                    for cat in all_cat_values}
+    
+    # Calculate ratios for the other industries
+    other_total = cube_companies(cube, exclude=[focus_industry])
+    other_counts_series = cube_counts(cube, category_col, exclude=[focus_industry])
+    other_ratios = {cat: other_counts_series.get(cat, 0) / other_total if other_total > 0 else 0 
+                    for cat in all_cat_values}
     
     # Create DataFrames for plotting
     ratio_df = pd.DataFrame({
         'Category': all_cat_values,
-        'Telco Ratio': [telco_ratios[cat] for cat in all_cat_values],
-        'Other Industries Ratio': [non_telco_ratios[cat] for cat in all_cat_values]
+        'Focus Ratio': [focus_ratios[cat] for cat in all_cat_values],
+        'Other Industries Ratio': [other_ratios[cat] for cat in all_cat_values]
     })
     
     # Get category labels if available
-    if f'{category_col} Label' in df.columns:
-        label_mapping = df[[category_col, f'{category_col} Label']].drop_duplicates()
-        label_mapping = dict(zip(label_mapping[category_col], label_mapping[f'{category_col} Label']))
-        ratio_df['Label'] = ratio_df['Category'].map(label_mapping)
-    else:
-        ratio_df['Label'] = ratio_df['Category']
+    label_mapping = cube['labels'].get(category_col, {})
+    ratio_df['Label'] = ratio_df['Category'].map(lambda x: label_mapping.get(x, x))
+    return ratio_df
+
+# Function to create ratio-based spider chart comparing the focus industry and other industries
+def create_ratio_spider_chart(cube, category_col, title, focus_industry=DEFAULT_FOCUS_INDUSTRY):
+    """Create a ratio-based spider chart comparing the focus industry vs. other industries"""
+    ratio_df = category_ratios(cube, category_col, focus_industry)
     
     # Create radar chart
     fig = plt.figure(figsize=(14, 14))
@@ -203,34 +202,16 @@ def create_ratio_spider_chart(df, category_col, title, filename=None):
     ratio_df = pd.concat([ratio_df, ratio_df.iloc[0:1]])
     angles = angles + [angles[0]]
     
-    # Enhanced colors with higher contrast
-    telco_color = (80/255, 10/255, 140/255)  # Darker purple for Telco
-    other_color = (220/255, 70/255, 160/255)  # Brighter pink for Other Industries
-    
-    # Plot data for Telco
-    ax.plot(angles, ratio_df['Telco Ratio'], 'o-', color=telco_color, linewidth=2.5, label='Telco')
-    ax.fill(angles, ratio_df['Telco Ratio'], color=telco_color, alpha=0.3)
+    # Plot data for the focus industry
+    ax.plot(angles, ratio_df['Focus Ratio'], 'o-', color=FOCUS_COLOR, linewidth=2.5, label=focus_industry)
+    ax.fill(angles, ratio_df['Focus Ratio'], color=FOCUS_COLOR, alpha=0.3)
     
     # Plot data for Other Industries
-    ax.plot(angles, ratio_df['Other Industries Ratio'], 'o-', color=other_color, linewidth=2.5, label='Other Industries')
-    ax.fill(angles, ratio_df['Other Industries Ratio'], color=other_color, alpha=0.3)
+    ax.plot(angles, ratio_df['Other Industries Ratio'], 'o-', color=OTHER_COLOR, linewidth=2.5, label='Other Industries')
+    ax.fill(angles, ratio_df['Other Industries Ratio'], color=OTHER_COLOR, alpha=0.3)
     
     # Process labels for line breaks
-    processed_labels = []
-    for label in ratio_df['Label'].iloc[:-1]:
-        # Add newline for labels containing "&" or "and"
-        if ' & ' in label:
-            label = label.replace(' & ', '\n& ')
-        elif ' and ' in label:
-            label = label.replace(' and ', '\nand ')
-        # Handle long labels (more than 20 chars)
-        elif len(label) > 20:
-            words = label.split()
-            mid_point = len(words) // 2
-            first_half = ' '.join(words[:mid_point])
-            second_half = ' '.join(words[mid_point:])
-            label = f"{first_half}\n{second_half}"
-        processed_labels.append(label)
+    processed_labels = [wrap_label(label) for label in ratio_df['Label'].iloc[:-1]]
     
     # Set category labels
     ax.set_xticks(angles[:-1])
@@ -245,134 +226,151 @@ def create_ratio_spider_chart(df, category_col, title, filename=None):
     # Draw grid
     ax.grid(True)
     
-    # Save if filename provided
-    if filename:
-        plt.tight_layout()
-        plt.savefig(f'gen_ai_cs_viz/{filename}.png', dpi=300, bbox_inches='tight')
+    plt.tight_layout()
         
     return fig
 
+# Store a spider chart of category counts, drawn with the chosen renderer
+def save_spider_chart(cat_counts_series, label_mapping, title, filename, renderer='matplotlib'):
+    """Return the artifact reference of the spider chart, a PNG via matplotlib or a directly written SVG"""
+    if renderer == 'svg':
+        cat_counts = spider_counts(cat_counts_series, label_mapping)
+        series = [('Count', list(cat_counts['Count']), color_palette[0], 2, 0.25)]
+        return save_svg(radar_svg([wrap_label(label) for label in cat_counts['Label']], series), filename)
+    return save_figure(create_spider_chart(cat_counts_series, label_mapping, title, include_title=False), filename)
+
+# Store a ratio spider chart of the focus industry vs. other industries, drawn with the chosen renderer
+def save_ratio_spider_chart(cube, category_col, title, filename, focus_industry=DEFAULT_FOCUS_INDUSTRY, renderer='matplotlib'):
+    """Return the artifact reference of the ratio chart, a PNG via matplotlib or a directly written SVG"""
+    if renderer == 'svg':
+        ratio_df = category_ratios(cube, category_col, focus_industry)
+        series = [(focus_industry, list(ratio_df['Focus Ratio']), FOCUS_COLOR, 2.5, 0.3),
+                  ('Other Industries', list(ratio_df['Other Industries Ratio']), OTHER_COLOR, 2.5, 0.3)]
+        return save_svg(radar_svg([wrap_label(label) for label in ratio_df['Label']], series), filename)
+    return save_figure(create_ratio_spider_chart(cube, category_col, title, focus_industry), filename)
+
 # Create spider charts for all industries by each category
-def create_all_industry_spider_charts(df):
-    """Create spider charts for all industries by each category"""
+def create_all_industry_spider_charts(cube, focus_industry=DEFAULT_FOCUS_INDUSTRY, cat_nums=CATEGORY_NUMS, renderer='matplotlib'):
+    """Create spider charts for all other industries and ratio charts against the focus industry"""
     spider_charts = {}
+    focus_key = industry_key(focus_industry)
     
-    # For each category, create a spider chart for non-Telco industries
-    non_telco_df = df[df['Industry'] != 'Telco']
-    for cat_num in range(1, 5):
+    # For each category, create a spider chart for the industries other than the focus industry
+    for cat_num in cat_nums:
         cat_col = f'Cat {cat_num}'
-        title = f'Distribution of {cat_col} Across All Industries Except Telco'
-        fig = create_spider_chart(non_telco_df, cat_col, title, f'all_industries_{cat_col}_spider', include_title=False)
-        spider_charts[f'all_industries_{cat_col}'] = fig_to_base64(fig)
+        title = f'Distribution of {cat_col} Across All Industries Except {focus_industry}'
+        counts = cube_counts(cube, cat_col, exclude=[focus_industry])
+        spider_charts[f'all_industries_{cat_col}'] = save_spider_chart(
+            counts, cube['labels'][cat_col], title, f'all_industries_except_{focus_key}_{cat_col}_spider', renderer)
     
-    # Create ratio comparison charts for Telco vs. Other Industries
-    for cat_num in range(1, 5):
+    # Create ratio comparison charts for the focus industry vs. Other Industries
+    for cat_num in cat_nums:
         cat_col = f'Cat {cat_num}'
-        title = f'Ratio Comparison of {cat_col}: Telco vs. Other Industries'
-        fig = create_ratio_spider_chart(df, cat_col, title, f'telco_vs_others_{cat_col}_ratio')
-        spider_charts[f'telco_vs_others_{cat_col}'] = fig_to_base64(fig)
+        title = f'Ratio Comparison of {cat_col}: {focus_industry} vs. Other Industries'
+        spider_charts[f'focus_vs_others_{cat_col}'] = save_ratio_spider_chart(
+            cube, cat_col, title, f'{focus_key}_vs_others_{cat_col}_ratio', focus_industry, renderer)
     
     return spider_charts
 
 # Create spider charts for each industry by each category
-def create_per_industry_spider_charts(df):
-    """Create spider charts for each industry separately by each category"""
+def create_per_industry_spider_charts(cube, industries=None, cat_nums=CATEGORY_NUMS, renderer='matplotlib'):
+    """Create spider charts for each industry (or only the given ones) separately by each category"""
     industry_spider_charts = {}
     
-    # First add Telco if it exists
-    if 'Telco' in df['Industry'].unique():
-        telco_df = df[df['Industry'] == 'Telco']
-        industry_spider_charts['Telco'] = {}
-        
-        for cat_num in range(1, 5):
-            cat_col = f'Cat {cat_num}'
-            title = f'Distribution of {cat_col} in Telco'
-            fig = create_spider_chart(telco_df, cat_col, title, f'Telco_{cat_col}_spider', include_title=False)
-            industry_spider_charts['Telco'][f'cat_{cat_num}'] = fig_to_base64(fig)
-    
-    # Get unique industries (excluding Telco)
-    industries = [ind for ind in df['Industry'].unique() if ind != 'Telco']
-    
     # For each industry and category, create a spider chart
-    for industry in industries:
-        industry_df = df[df['Industry'] == industry]
-        industry_key = industry.replace(' ', '_').replace('&', 'and')
-        
+    for industry in industries if industries is not None else cube_industries(cube):
         industry_spider_charts[industry] = {}
         
-        for cat_num in range(1, 5):
+        for cat_num in cat_nums:
             cat_col = f'Cat {cat_num}'
             title = f'Distribution of {cat_col} in {industry}'
-            fig = create_spider_chart(industry_df, cat_col, title, f'{industry_key}_{cat_col}_spider', include_title=False)
-            industry_spider_charts[industry][f'cat_{cat_num}'] = fig_to_base64(fig)
+            counts = cube_counts(cube, cat_col, industries=[industry])
+            industry_spider_charts[industry][f'cat_{cat_num}'] = save_spider_chart(
+                counts, cube['labels'][cat_col], title, f'{industry_key(industry)}_{cat_col}_spider', renderer)
     
     return industry_spider_charts
 
+# Count distinct companies for each observed pair of category values (sparse crosstab)
+def sparse_crosstab(df, row_col, col_col):
+    """Return distinct-company counts for each observed (row, col) value pair as a long Series"""
+    company_cats = df[['Company', row_col, col_col]].drop_duplicates()
+    return company_cats.groupby([row_col, col_col]).size()
+
+# Expand a sparse crosstab into a dense count matrix for rendering
+def densify_crosstab(sparse_counts):
+    """Return the dense count matrix with its row and column values"""
+    row_values, row_codes = np.unique(sparse_counts.index.get_level_values(0), return_inverse=True)
+    col_values, col_codes = np.unique(sparse_counts.index.get_level_values(1), return_inverse=True)
+    matrix = np.zeros((len(row_values), len(col_values)), dtype=np.int64)
+    matrix[row_codes, col_codes] = sparse_counts.values
+    return matrix, row_values, col_values
+
+# Reorder rows and columns so that similar category values end up next to each other
+def cluster_order(matrix):
+    """Return row and column orders from the leading singular vectors of the count matrix"""
+    if min(matrix.shape) < 2:
+        return np.arange(matrix.shape[0]), np.arange(matrix.shape[1])
+    # Normalise by the marginals so that frequent values don't dominate the ordering
+    weights = matrix / np.sqrt(np.outer(matrix.sum(axis=1) + 1, matrix.sum(axis=0) + 1))
+    u, _, vt = np.linalg.svd(weights, full_matrices=False)
+    return np.argsort(u[:, 1]), np.argsort(vt[1])
+
+# Draw a count matrix as a heatmap, switching to a single image for large matrices
+def render_heatmap(matrix, row_labels, col_labels, title, row_title=None, col_title=None):
+    """Render a heatmap figure, annotating cells only while the matrix stays small"""
+    custom_cmap = LinearSegmentedColormap.from_list("custom_purple", 
+                                                   [(1, 1, 1)] + color_palette, N=100)
+    fig, ax = plt.subplots(figsize=(14, 12))
+    
+    # Annotate only matrices small enough for every row and column to keep its own label
+    if matrix.size <= HEATMAP_ANNOTATION_MAX_CELLS and max(matrix.shape) <= HEATMAP_MAX_TICK_LABELS:
+        sns.heatmap(matrix, ax=ax, cmap=custom_cmap, annot=True, fmt='d',
+                    xticklabels=col_labels, yticklabels=row_labels,
+                    cbar_kws={'label': 'Frequency'}, annot_kws={"size": 14})
+        ax.set_xticklabels(col_labels, rotation=45, ha='right', fontsize=16)
+        ax.set_yticklabels(row_labels, rotation=0, fontsize=16)
+    else:
+        # One image artist regardless of the number of cells, no per-cell text
+        image = ax.imshow(matrix, cmap=custom_cmap, aspect='auto', interpolation='nearest')
+        fig.colorbar(image, ax=ax, label='Frequency')
+        
+        # Thin out tick labels so they stay readable
+        x_step = int(np.ceil(len(col_labels) / HEATMAP_MAX_TICK_LABELS))
+        y_step = int(np.ceil(len(row_labels) / HEATMAP_MAX_TICK_LABELS))
+        ax.set_xticks(np.arange(0, len(col_labels), x_step))
+        ax.set_xticklabels(col_labels[::x_step], rotation=45, ha='right', fontsize=10)
+        ax.set_yticks(np.arange(0, len(row_labels), y_step))
+        ax.set_yticklabels(row_labels[::y_step], rotation=0, fontsize=10)
+    
+    # A bare matrix carries no axis names, unlike the crosstab the heatmaps used to be drawn from
+    ax.set_xlabel(col_title)
+    ax.set_ylabel(row_title)
+    ax.set_title(title, fontsize=20, color=color_palette[0], fontweight='bold')
+    fig.tight_layout()
+    return fig
+
 # Create heatmap to identify correlations between categories
-def create_heatmap(df):
-    """Create heatmaps to identify correlations between categories"""
+def create_heatmap(df, industry=None, cluster=False, category_pairs=CATEGORY_PAIRS):
+    """Create heatmaps to identify correlations between categories, for all industries or a single one"""
     heatmaps = {}
     
-    # Create pairs of categories for correlation analysis
-    category_pairs = [(i, j) for i in range(1, 5) for j in range(i+1, 5)]
-    
-    # Create heatmaps for all industries
-    for cat1, cat2 in category_pairs:
-        # Create a crosstab of the two categories, only counting unique companies
-        company_cats = df[['Company', f'Cat {cat1}', f'Cat {cat2}']].drop_duplicates()
-        
-        # Create the crosstab
-        cross_tab = pd.crosstab(company_cats[f'Cat {cat1}'], company_cats[f'Cat {cat2}'])
-        
-        # Create heatmap
-        plt.figure(figsize=(14, 12))
-        custom_cmap = LinearSegmentedColormap.from_list("custom_purple", 
-                                                       [(1, 1, 1)] + color_palette, N=100)
-        
-        ax = sns.heatmap(cross_tab, cmap=custom_cmap, annot=True, fmt='d',
-                   cbar_kws={'label': 'Frequency'}, annot_kws={"size": 14})
-        
-        # Get category labels
-        cat1_labels = df[[f'Cat {cat1}', f'Cat {cat1} Label']].drop_duplicates()
-        cat1_label_dict = dict(zip(cat1_labels[f'Cat {cat1}'], cat1_labels[f'Cat {cat1} Label']))
-        
-        cat2_labels = df[[f'Cat {cat2}', f'Cat {cat2} Label']].drop_duplicates()
-        cat2_label_dict = dict(zip(cat2_labels[f'Cat {cat2}'], cat2_labels[f'Cat {cat2} Label']))
-        
-        # Set new labels with both number and text
-        new_x_labels = [f"{idx} - {cat2_label_dict.get(idx, '')}" for idx in cross_tab.columns]
-        new_y_labels = [f"{idx} - {cat1_label_dict.get(idx, '')}" for idx in cross_tab.index]
-        
-        ax.set_xticklabels(new_x_labels, rotation=45, ha='right', fontsize=16)
-        ax.set_yticklabels(new_y_labels, rotation=0, fontsize=16)
-        
-        plt.title(f'Correlation between Cat {cat1} and Cat {cat2}', fontsize=20, color=color_palette[0], fontweight='bold')
-        plt.tight_layout()
-        
-        # Save the figure
-        filename = f'heatmap_cat{cat1}_cat{cat2}'
-        plt.savefig(f'gen_ai_cs_viz/{filename}.png', dpi=300, bbox_inches='tight')
-        
-        heatmaps[f'cat{cat1}_cat{cat2}'] = fig_to_base64(plt.gcf())
-        plt.close()
+    # Heatmaps for all industries, or specifically for one industry
+    if industry is None:
+        segments = [(df, '', '')]
+    else:
+        industry_df = df[df['Industry'] == industry]
+        segments = [(industry_df, f'{industry_key(industry)}_', f' in {industry}')] if not industry_df.empty else []
     
-    # Create heatmaps specifically for Telco
-    telco_df = df[df['Industry'] == 'Telco']
-    if not telco_df.empty:
+    for segment_df, prefix, title_suffix in segments:
         for cat1, cat2 in category_pairs:
-            # Create a crosstab of the two categories, only counting unique companies
-            company_cats = telco_df[['Company', f'Cat {cat1}', f'Cat {cat2}']].drop_duplicates()
-            
-            # Create the crosstab
-            cross_tab = pd.crosstab(company_cats[f'Cat {cat1}'], company_cats[f'Cat {cat2}'])
-            
-            # Create heatmap
-            plt.figure(figsize=(14, 12))
-            custom_cmap = LinearSegmentedColormap.from_list("custom_purple", 
-                                                         [(1, 1, 1)] + color_palette, N=100)
+            # Only counting unique companies, and only the cells that actually occur
+            sparse_counts = sparse_crosstab(segment_df, f'Cat {cat1}', f'Cat {cat2}')
+            matrix, row_values, col_values = densify_crosstab(sparse_counts)
             
-            ax = sns.heatmap(cross_tab, cmap=custom_cmap, annot=True, fmt='d',
-                     cbar_kws={'label': 'Frequency'}, annot_kws={"size": 14})
+            if cluster:
+                row_order, col_order = cluster_order(matrix)
+                matrix = matrix[np.ix_(row_order, col_order)]
+                row_values, col_values = row_values[row_order], col_values[col_order]
             
             # Get category labels
             cat1_labels = df[[f'Cat {cat1}', f'Cat {cat1} Label']].drop_duplicates()
@@ -382,115 +380,382 @@ def create_heatmap(df):
             cat2_label_dict = dict(zip(cat2_labels[f'Cat {cat2}'], cat2_labels[f'Cat {cat2} Label']))
             
             # Set new labels with both number and text
-            new_x_labels = [f"{idx} - {cat2_label_dict.get(idx, '')}" for idx in cross_tab.columns]
-            new_y_labels = [f"{idx} - {cat1_label_dict.get(idx, '')}" for idx in cross_tab.index]
+            new_x_labels = [f"{idx} - {cat2_label_dict.get(idx, '')}" for idx in col_values]
+            new_y_labels = [f"{idx} - {cat1_label_dict.get(idx, '')}" for idx in row_values]
             
-            ax.set_xticklabels(new_x_labels, rotation=45, ha='right', fontsize=16)
-            ax.set_yticklabels(new_y_labels, rotation=0, fontsize=16)
-            
-            plt.title(f'Correlation between Cat {cat1} and Cat {cat2} in Telco', fontsize=20, color=color_palette[0], fontweight='bold')
-            plt.tight_layout()
+            fig = render_heatmap(matrix, new_y_labels, new_x_labels,
+                                 f'Correlation between Cat {cat1} and Cat {cat2}{title_suffix}',
+                                 row_title=f'Cat {cat1}', col_title=f'Cat {cat2}')
             
             # Save the figure
-            filename = f'telco_heatmap_cat{cat1}_cat{cat2}'
-            plt.savefig(f'gen_ai_cs_viz/{filename}.png', dpi=300, bbox_inches='tight')
-            
-            heatmaps[f'telco_cat{cat1}_cat{cat2}'] = fig_to_base64(plt.gcf())
-            plt.close()
+            filename = f'{prefix}heatmap_cat{cat1}_cat{cat2}'
+            # The continuous colormap would band if quantized to a palette
+            heatmaps[f'cat{cat1}_cat{cat2}'] = save_figure(fig, filename, quantize=False)
     
     return heatmaps
 
-# Function to generate additional insights about Telco vs other industries
-def generate_telco_insights(df):
-    """Generate specific insights comparing Telco to other industries"""
-    telco_df = df[df['Industry'] == 'Telco']
-    non_telco_df = df[df['Industry'] != 'Telco']
-    
+# Create the heatmap of every category pair from its distinct-company table
+def create_pair_heatmaps(pair_tables, industry=None, cluster=False):
+    """Create the heatmaps of create_heatmap from the tables of pair_tables instead of the full data"""
+    heatmaps = {}
+    for category_pair, table in pair_tables.items():
+        heatmaps.update(create_heatmap(table, industry=industry, cluster=cluster, category_pairs=[category_pair]))
+    return heatmaps
+
+# Table of a single category pair, for the stage drawing its heatmaps
+def select_pair_table(pair_tables, category_pair, industry=None):
+    """Return the pair's table as a one-pair dict, restricted to an industry's rows if given"""
+    table = pair_tables[category_pair]
+    if industry is not None:
+        table = table[table['Industry'] == industry]
+    return {category_pair: table}
+
+# Create the heatmaps of one category pair from the shared dataset
+def create_dataset_heatmaps(dataset, category_pair, segment_id=None, cluster=False):
+    """Decode only the pair's columns, of one industry segment or of all of them, and draw their heatmaps"""
+    cat1, cat2 = category_pair
+    columns = ['Industry', 'Company', f'Cat {cat1}', f'Cat {cat2}', f'Cat {cat1} Label', f'Cat {cat2} Label']
+    if segment_id is None:
+        df = pd.concat([dataset.segment(position, columns) for position in range(len(dataset.segments))], ignore_index=True)
+        return create_heatmap(df, cluster=cluster, category_pairs=[category_pair])
+    return create_heatmap(dataset.segment(segment_id, columns), industry=dataset.segments[segment_id][0],
+                          cluster=cluster, category_pairs=[category_pair])
+
+# Function to generate additional insights about the focus industry vs other industries
+def generate_focus_insights(cube, focus_industry=DEFAULT_FOCUS_INDUSTRY):
+    """Generate specific insights comparing the focus industry to other industries"""
     insights = {}
     
-    # Count unique companies for normalization
-    telco_companies = telco_df['Company'].nunique()
-    non_telco_companies = non_telco_df['Company'].nunique()
-    
-    # Get unique company-category combinations for accurate counting
-    for cat_num in range(1, 5):
-        cat_col = f'Cat {cat_num}'
-        label_col = f'Cat {cat_num} Label'
-        
-        # Telco top categories
-        telco_cat_company = telco_df[['Company', cat_col, label_col]].drop_duplicates()
-        if not telco_cat_company.empty:
-            telco_top_cats = telco_cat_company[label_col].value_counts()
-            insights[f'telco_cat{cat_num}_top'] = telco_top_cats.index[0] if len(telco_top_cats) > 0 else "N/A"
-            
-            # Calculate percentage for top category
-            top_cat_count = telco_top_cats.iloc[0] if len(telco_top_cats) > 0 else 0
-            insights[f'telco_cat{cat_num}_top_percent'] = round((top_cat_count / telco_companies) * 100, 1) if telco_companies > 0 else 0
-        else:
-            insights[f'telco_cat{cat_num}_top'] = "N/A"
-            insights[f'telco_cat{cat_num}_top_percent'] = 0
-        
-        # Non-Telco top categories
-        non_telco_cat_company = non_telco_df[['Company', cat_col, label_col]].drop_duplicates()
-        if not non_telco_cat_company.empty:
-            non_telco_top_cats = non_telco_cat_company[label_col].value_counts()
-            insights[f'non_telco_cat{cat_num}_top'] = non_telco_top_cats.index[0] if len(non_telco_top_cats) > 0 else "N/A"
-            
-            # Calculate percentage for top category
-            top_cat_count = non_telco_top_cats.iloc[0] if len(non_telco_top_cats) > 0 else 0
-            insights[f'non_telco_cat{cat_num}_top_percent'] = round((top_cat_count / non_telco_companies) * 100, 1) if non_telco_companies > 0 else 0
-        else:
-            insights[f'non_telco_cat{cat_num}_top'] = "N/A"
-            insights[f'non_telco_cat{cat_num}_top_percent'] = 0
-    
-    # Find most distinctive categories for Telco compared to other industries
     for cat_num in range(1, 5):
         cat_col = f'Cat {cat_num}'
-        label_col = f'Cat {cat_num} Label'
+        labels = cube['labels'][cat_col]
         
-        telco_cat_company = telco_df[['Company', cat_col, label_col]].drop_duplicates()
-        non_telco_cat_company = non_telco_df[['Company', cat_col, label_col]].drop_duplicates()
+        # Counts, shares and lift of every category value, for the focus industry against the others
+        lift = category_lift(cube, cat_col).loc[focus_industry]
         
-        # Calculate frequencies
-        if not telco_cat_company.empty and not non_telco_cat_company.empty:
-            telco_freqs = telco_cat_company[cat_col].value_counts(normalize=True)
-            non_telco_freqs = non_telco_cat_company[cat_col].value_counts(normalize=True)
-            
-            # Find categories with biggest difference (Telco > Other)
-            differences = {}
-            for cat in telco_freqs.index:
-                telco_freq = telco_freqs.get(cat, 0)
-                non_telco_freq = non_telco_freqs.get(cat, 0)
-                differences[cat] = telco_freq - non_telco_freq
-            
-            # Get the category with biggest positive difference (more in Telco)
-            if differences:
-                most_distinctive_cat = max(differences.items(), key=lambda x: x[1])
-                if most_distinctive_cat[1] > 0:  # Only if Telco has more
-                    cat_label = telco_df[telco_df[cat_col] == most_distinctive_cat[0]][label_col].iloc[0] if not telco_df[telco_df[cat_col] == most_distinctive_cat[0]].empty else "N/A"
-                    insights[f'telco_distinctive_cat{cat_num}'] = cat_label
-                    insights[f'telco_distinctive_cat{cat_num}_diff'] = round(most_distinctive_cat[1] * 100, 1)  # Convert to percentage
-                else:
-                    insights[f'telco_distinctive_cat{cat_num}'] = "None"
-                    insights[f'telco_distinctive_cat{cat_num}_diff'] = 0
+        # Top categories for the focus industry and for the others
+        for prefix, count_col, share_col, rank_col in [('focus', 'count', 'company_share', 'rank'),
+                                                       ('non_focus', 'rest_count', 'rest_company_share', 'rest_rank')]:
+            if lift[count_col].sum() > 0:
+                top = lift[rank_col].idxmin()
+                insights[f'{prefix}_cat{cat_num}_top'] = labels.get(top, "N/A")
+                
+                # Calculate percentage for top category
+                insights[f'{prefix}_cat{cat_num}_top_percent'] = round(lift.loc[top, share_col] * 100, 1)
             else:
-                insights[f'telco_distinctive_cat{cat_num}'] = "None"
-                insights[f'telco_distinctive_cat{cat_num}_diff'] = 0
+                insights[f'{prefix}_cat{cat_num}_top'] = "N/A"
+                insights[f'{prefix}_cat{cat_num}_top_percent'] = 0
+        
+        # Find most distinctive categories for the focus industry compared to other industries
+        insights[f'focus_distinctive_cat{cat_num}'] = "None"
+        insights[f'focus_distinctive_cat{cat_num}_diff'] = 0
+        if lift['count'].sum() > 0 and lift['rest_count'].sum() > 0:
+            # The category with biggest positive difference (more in the focus industry), ties in rank order
+            distinctive = lift.sort_values('rank')['difference'].idxmax()
+            if lift.loc[distinctive, 'difference'] > 0:
+                insights[f'focus_distinctive_cat{cat_num}'] = labels.get(distinctive, "N/A")
+                insights[f'focus_distinctive_cat{cat_num}_diff'] = round(lift.loc[distinctive, 'difference'] * 100, 1)  # Convert to percentage
     
     return insights
 
+# Charts and statistics that differ per focus industry
+def assemble_focus_report(focus_industry, basic_stats, spider_charts, heatmaps, insights):
+    """Bundle everything specific to one focus industry's report"""
+    return {
+        'focus_industry': focus_industry,
+        'basic_stats': basic_stats,
+        'spider_charts': spider_charts,
+        'heatmaps': heatmaps,
+        'insights': insights
+    }
+
+# Run a chart-creating function and wait until its images are in the artifact store
+def render_charts(create_charts, *args, **kwargs):
+    charts = create_charts(*args, **kwargs)
+    chart_encoder().wait()
+    return charts
+
+# Combine the chart dicts of several stages
+def merge_charts(*charts):
+    return {key: value for stage_charts in charts for key, value in stage_charts.items()}
+
+# Combine per-industry chart dicts, keeping each industry's charts together
+def merge_industry_charts(*charts):
+    merged = {}
+    for stage_charts in charts:
+        for industry, industry_charts in stage_charts.items():
+            merged.setdefault(industry, {}).update(industry_charts)
+    return merged
+
+# Combine the focus spider charts of several categories, the overall charts before the ratio charts
+def merge_focus_spider_charts(*charts):
+    merged = merge_charts(*charts)
+    return {key: merged[key] for prefix in ('all_industries_', 'focus_vs_others_') for key in merged if key.startswith(prefix)}
+
+# Key the focus reports by focus industry
+def collect_focus_reports(focus_industries, *focus_reports):
+    return dict(zip(focus_industries, focus_reports))
+
+# Stages aggregating the data of a single table
+def data_stages(relative_error=None):
+    """Stages reducing 'df' to the 'cube', 'pair_tables' and 'profiles' the analysis stages work from"""
+    return [
+        Stage('cube', partial(build_cube, relative_error=relative_error), ['df']),
+        Stage('pair_tables', partial(pair_tables, category_pairs=CATEGORY_PAIRS), ['df']),
+        Stage('profiles', profile_table, ['df'])
+    ]
+
+# Identify an input file together with its current version
+def shard_source(path):
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+# Reduce one input file to partial aggregates
+def reduce_shard(source, relative_error=None):
+    """Preprocess a workbook (or read a preprocessed CSV) and reduce it to its partial cube, pair tables and profiles"""
+    path = source[0]
+    if os.path.splitext(path)[1].lower() in ('.xlsx', '.xlsm'):
+        df = as_csv_types(load_preprocessed(path))
+    else:
+        df = pd.read_csv(path)
+    return partial_cube(df, relative_error), pair_tables(df, CATEGORY_PAIRS), profile_table(df)
+
+# Reduce one industry segment of the shared dataset to partial aggregates
+def reduce_segment(dataset, segment_id, relative_error=None):
+    """Decode a segment of the shared dataset and reduce it to its partial cube, pair tables and profiles"""
+    df = dataset.segment(segment_id)
+    return partial_cube(df, relative_error), pair_tables(df, CATEGORY_PAIRS), profile_table(df)
+
+# Stages aggregating the shared dataset one industry segment per task
+def segment_stages(dataset, relative_error=None):
+    """Stages reducing each segment of 'dataset' in a worker and merging them into 'cube', 'pair_tables' and 'profiles'
+
+    Tasks only carry the dataset handle and a segment id, so their cost does not grow with the data.
+    """
+    names = [industry for industry, _, _ in dataset.segments]
+    stages = [Stage(f'segment:{name}', partial(reduce_segment, segment_id=segment_id, relative_error=relative_error),
+                    ['dataset'], outputs=[f'partial_cube:{name}', f'partial_pairs:{name}', f'partial_profiles:{name}'])
+              for segment_id, name in enumerate(names)]
+    return stages + merge_stages(names, global_rows=True)
+
+# Stages merging the partial aggregates of several shards or segments
+def merge_stages(names, global_rows=False):
+    return [
+        Stage('cube', partial(merge_partial_cubes, global_rows=global_rows), [f'partial_cube:{name}' for name in names]),
+        Stage('pair_tables', merge_pair_tables, [f'partial_pairs:{name}' for name in names]),
+        Stage('profiles', merge_profile_tables, [f'partial_profiles:{name}' for name in names])
+    ]
+
+# Stages aggregating many input files
+def shard_stages(paths, relative_error=None):
+    """Stages reducing each 'source:<path>' to partials in its own worker and merging them into 'cube',
+    'pair_tables' and 'profiles'"""
+    stages = [Stage(f'shard:{path}', partial(reduce_shard, relative_error=relative_error), [f'source:{path}'],
+                    outputs=[f'partial_cube:{path}', f'partial_pairs:{path}', f'partial_profiles:{path}'])
+              for path in paths]
+    return stages + merge_stages(paths)
+
+# Query the aggregates from the embedded store
+def query_store(source):
+    """Return the cube, pair tables and profiles of the store identified by source (see shard_source)"""
+    path = source[0]
+    return cube_from_store(path), store_pair_tables(CATEGORY_PAIRS, path), store_profile_table(path)
+
+# Stages aggregating the data held in the embedded store
+def store_stages():
+    """Stage querying 'cube', 'pair_tables' and 'profiles' from the store identified by 'store'"""
+    return [Stage('store_aggregates', query_store, ['store'], outputs=['cube', 'pair_tables', 'profiles'])]
+
+# Stages of the analysis, from the aggregates to everything the HTML reports need
+def analysis_stages(industries, focus_industries, renderer='matplotlib', dataset=None, cluster=False):
+    """Declare the analysis as a DAG of stages reading 'cube', 'pair_tables' and 'profiles' and producing
+    'per_industry_spider_charts', 'heatmaps', 'peers', 'combinations' and 'focus_reports'
+
+    Given the shared dataset (the 'dataset' value), heatmaps decode their rows from it
+    instead of receiving the pair tables. With cluster, heatmap rows and columns are
+    ordered so that similar category values are adjacent.
+    """
+    stages = [Stage('peers', company_peers, ['profiles']), Stage('combinations', frequent_combinations, ['profiles'])]
+
+    def heatmap_stages(name, category_pair, pair_name, industry=None):
+        if dataset is not None:
+            segment_id = None if industry is None else dataset.segment_id(industry)
+            return [Stage(name, partial(render_charts, create_dataset_heatmaps, category_pair=category_pair,
+                                        segment_id=segment_id, cluster=cluster),
+                          ['dataset'], check=artifacts_exist)]
+        table = f'pair_table:{pair_name}' if industry is None else f'pair_table:{industry}:{pair_name}'
+        return [Stage(table, partial(select_pair_table, category_pair=category_pair, industry=industry), ['pair_tables'],
+                      local=True),
+                Stage(name, partial(render_charts, create_pair_heatmaps, industry=industry, cluster=cluster), [table],
+                      check=artifacts_exist)]
+
+    # Shared by every report; every chart stage reads only the cube cells or pair table it
+    # draws, so that its charts are only redrawn when those change
+    for industry in industries:
+        for cat_num in CATEGORY_NUMS:
+            stages += [
+                Stage(f'cube:{industry}:Cat {cat_num}', partial(cube_slice, industries=[industry], columns=[f'Cat {cat_num}']),
+                      ['cube'], local=True),
+                Stage(f'industry_spider_charts:{industry}:Cat {cat_num}',
+                      partial(render_charts, create_per_industry_spider_charts, industries=[industry], cat_nums=[cat_num],
+                              renderer=renderer),
+                      [f'cube:{industry}:Cat {cat_num}'], check=artifacts_exist)
+            ]
+    stages.append(Stage('per_industry_spider_charts', merge_industry_charts,
+                        [f'industry_spider_charts:{industry}:Cat {cat_num}' for industry in industries for cat_num in CATEGORY_NUMS]))
+    stages += [Stage(f'cube:Cat {cat_num}', partial(cube_slice, columns=[f'Cat {cat_num}']), ['cube'], local=True)
+               for cat_num in CATEGORY_NUMS]
+
+    pair_names = [f'cat{cat1}_cat{cat2}' for cat1, cat2 in CATEGORY_PAIRS]
+    for category_pair, pair_name in zip(CATEGORY_PAIRS, pair_names):
+        stages += heatmap_stages(f'pair_heatmaps:{pair_name}', category_pair, pair_name)
+    stages.append(Stage('heatmaps', merge_charts, [f'pair_heatmaps:{pair_name}' for pair_name in pair_names]))
+
+    # Only what differs per focus industry
+    for focus_industry in focus_industries:
+        for cat_num in CATEGORY_NUMS:
+            stages.append(Stage(f'focus_spider_charts:{focus_industry}:Cat {cat_num}',
+                                partial(render_charts, create_all_industry_spider_charts, focus_industry=focus_industry,
+                                        cat_nums=[cat_num], renderer=renderer),
+                                [f'cube:Cat {cat_num}'], check=artifacts_exist))
+        for category_pair, pair_name in zip(CATEGORY_PAIRS, pair_names):
+            stages += heatmap_stages(f'focus_pair_heatmaps:{focus_industry}:{pair_name}', category_pair, pair_name,
+                                     focus_industry)
+        stages += [
+            Stage(f'basic_stats:{focus_industry}', partial(get_basic_stats, focus_industry=focus_industry), ['cube']),
+            Stage(f'focus_spider_charts:{focus_industry}', merge_focus_spider_charts,
+                  [f'focus_spider_charts:{focus_industry}:Cat {cat_num}' for cat_num in CATEGORY_NUMS]),
+            Stage(f'focus_heatmaps:{focus_industry}', merge_charts,
+                  [f'focus_pair_heatmaps:{focus_industry}:{pair_name}' for pair_name in pair_names]),
+            Stage(f'insights:{focus_industry}', partial(generate_focus_insights, focus_industry=focus_industry), ['cube']),
+            Stage(f'focus_report:{focus_industry}', partial(assemble_focus_report, focus_industry),
+                  [f'basic_stats:{focus_industry}', f'focus_spider_charts:{focus_industry}',
+                   f'focus_heatmaps:{focus_industry}', f'insights:{focus_industry}'])
+        ]
+    stages.append(Stage('focus_reports', partial(collect_focus_reports, focus_industries),
+                        [f'focus_report:{focus_industry}' for focus_industry in focus_industries]))
+    return stages
+
+# Pick the focus industries requested on the command line
+def resolve_focus_industries(industries, requested):
+    """Return the focus industries to report on, 'all' selecting every industry"""
+    if not requested:
+        return [DEFAULT_FOCUS_INDUSTRY]
+    if 'all' in requested:
+        return list(industries)
+    unknown = [industry for industry in requested if industry not in set(industries)]
+    if unknown:
+        raise ValueError(f"Unknown focus industries: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
 # Generate all visualizations
-basic_stats = get_basic_stats(df)
-all_industry_spider_charts = create_all_industry_spider_charts(df)
-per_industry_spider_charts = create_per_industry_spider_charts(df)
-heatmaps = create_heatmap(df)
-telco_insights = generate_telco_insights(df)
-
-# Save the results for the HTML generator
-np.save('gen_ai_cs_viz/basic_stats.npy', basic_stats)
-np.save('gen_ai_cs_viz/all_industry_spider_charts.npy', all_industry_spider_charts)
-np.save('gen_ai_cs_viz/per_industry_spider_charts.npy', per_industry_spider_charts)
-np.save('gen_ai_cs_viz/heatmaps.npy', heatmaps)
-np.save('gen_ai_cs_viz/telco_insights.npy', telco_insights)
-
-print("Data analysis and visualization complete. Now generating HTML...")
+def run_analysis(df, focus_industries, workers=STAGE_WORKERS, relative_error=None, renderer='matplotlib', cluster=False):
+    """Render shared charts once and the focus-specific ones per focus industry
+
+    With a relative_error the cube-based figures are approximate distinct counts.
+    Returns the pipeline's values, from the 'cube' to the 'focus_reports'.
+    """
+    # Create folder for images if it doesn't exist
+    os.makedirs('gen_ai_cs_viz', exist_ok=True)
+    
+    # Independent stages run side by side, unchanged ones are taken from their checkpoints
+    industries = list(df['Industry'].unique())
+    if workers > 1:
+        # Workers map the published table instead of receiving a pickled copy of df each
+        with SharedDataset.publish(df) as dataset:
+            stages = segment_stages(dataset, relative_error) + analysis_stages(industries, focus_industries, renderer, dataset, cluster)
+            results = run_pipeline(stages, {'dataset': dataset}, workers=workers)
+    else:
+        stages = data_stages(relative_error) + analysis_stages(industries, focus_industries, renderer, cluster=cluster)
+        results = run_pipeline(stages, {'df': df}, workers=workers)
+    
+    save_results(results['cube'], results['per_industry_spider_charts'], results['heatmaps'],
+                 results['focus_reports'], results['pair_tables'], results['peers'],
+                 results['combinations'])
+    return results
+
+# Generate all visualizations from many input files
+def run_sharded_analysis(paths, requested_focus_industries, workers=STAGE_WORKERS, relative_error=None, renderer='matplotlib',
+                         cluster=False):
+    """Reduce every input file to partial aggregates in its own worker, merge them and render the charts
+
+    Only one file's rows are held by a worker at a time; the merged aggregates hold distinct
+    companies per cube cell and category pair (or sketches, with a relative_error).
+    """
+    sources = {f'source:{path}': shard_source(path) for path in paths}
+    run_aggregated_analysis(shard_stages(paths, relative_error), sources, requested_focus_industries, workers, renderer, cluster)
+
+# Generate all visualizations from the embedded store
+def run_store_analysis(path, requested_focus_industries, workers=STAGE_WORKERS, renderer='matplotlib', cluster=False):
+    """Query the aggregates from the store instead of scanning the rows, then render the charts"""
+    run_aggregated_analysis(store_stages(), {'store': shard_source(path)}, requested_focus_industries, workers, renderer, cluster)
+
+# Render the charts from aggregates computed by a first pipeline
+def run_aggregated_analysis(aggregate_stages, sources, requested_focus_industries, workers=STAGE_WORKERS, renderer='matplotlib',
+                            cluster=False):
+    os.makedirs('gen_ai_cs_viz', exist_ok=True)
+    
+    aggregates = run_pipeline(aggregate_stages, sources, workers=workers)
+    
+    # The industries, and thus the analysis stages, are only known once the aggregates are computed
+    industries = cube_industries(aggregates['cube'])
+    focus_industries = resolve_focus_industries(industries, requested_focus_industries)
+    values = {name: aggregates[name] for name in ('cube', 'pair_tables', 'profiles')}
+    results = run_pipeline(analysis_stages(industries, focus_industries, renderer, cluster=cluster), values, workers=workers)
+    
+    save_results(values['cube'], results['per_industry_spider_charts'], results['heatmaps'],
+                 results['focus_reports'], values['pair_tables'], results['peers'],
+                 results['combinations'])
+
+# Save the results for the HTML generator (charts are stored as artifact references)
+def save_results(cube, per_industry_spider_charts, heatmaps, focus_reports, pair_tables, peers, combinations):
+    np.save('gen_ai_cs_viz/cube.npy', cube)
+    np.save('gen_ai_cs_viz/per_industry_spider_charts.npy', per_industry_spider_charts)
+    np.save('gen_ai_cs_viz/heatmaps.npy', heatmaps)
+    np.save('gen_ai_cs_viz/focus_reports.npy', focus_reports)
+    np.save('gen_ai_cs_viz/pair_tables.npy', pair_tables)
+    np.save('gen_ai_cs_viz/peers.npy', peers.to_dict('list'))
+    np.save('gen_ai_cs_viz/combinations.npy', combinations.to_dict('list'))
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the charts and statistics for the GenAI customer service report')
+    parser.add_argument('--focus', action='append', dest='focus_industries', metavar='INDUSTRY',
+                        help=f'industry to build a deep-dive report for, repeatable; "all" for every industry (default: {DEFAULT_FOCUS_INDUSTRY})')
+    parser.add_argument('--workers', type=int, default=STAGE_WORKERS,
+                        help=f'number of stages run in parallel processes (default: {STAGE_WORKERS})')
+    parser.add_argument('--approximate', nargs='?', type=float, const=SKETCH_RELATIVE_ERROR, metavar='ERROR',
+                        help=f'count companies with HyperLogLog sketches of the given relative error (default: {SKETCH_RELATIVE_ERROR})')
+    parser.add_argument('--shards', nargs='+', metavar='FILE',
+                        help='aggregate these workbooks or preprocessed CSVs, one worker per file, instead of the Tableau data')
+    parser.add_argument('--store', action='store_true',
+                        help=f'query the counts from the indexed SQLite store ({STORE_PATH}) instead of loading the data')
+    parser.add_argument('--radar', choices=RADAR_RENDERERS, default='matplotlib',
+                        help='draw the spider charts as matplotlib PNGs or write them directly as SVG (default: matplotlib)')
+    parser.add_argument('--cluster-heatmaps', action='store_true',
+                        help='order heatmap rows and columns so that similar category values are adjacent')
+    args = parser.parse_args()
+    
+    if args.store and (args.shards or args.approximate is not None):
+        parser.error('--store cannot be combined with --shards or --approximate')
+    
+    if args.store:
+        # Refresh the store when it is missing or older than the CSV (e.g. edited by hand)
+        if not os.path.exists(STORE_PATH) or os.path.getmtime(STORE_PATH) < os.path.getmtime(DATA_PATH):
+            write_store(pd.read_csv(DATA_PATH))
+        run_store_analysis(STORE_PATH, args.focus_industries, workers=args.workers, renderer=args.radar,
+                           cluster=args.cluster_heatmaps)
+    elif args.shards:
+        run_sharded_analysis(args.shards, args.focus_industries, workers=args.workers,
+                             relative_error=args.approximate, renderer=args.radar, cluster=args.cluster_heatmaps)
+    else:
+        # Load the data
+        df = load_data()
+        
+        run_analysis(df, resolve_focus_industries(df['Industry'].unique(), args.focus_industries),
+                     workers=args.workers, relative_error=args.approximate, renderer=args.radar,
+                     cluster=args.cluster_heatmaps)
+    
+    print("Data analysis and visualization complete. Now generating HTML...")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+# Brotli variants need the brotli package; without it only gzip variants are written
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Directory the static bundle is written to, ready to be synced to the file server
+BUNDLE_DIR = 'gen_ai_cs_bundle'
+
+# Subdirectory of the bundle holding the content-hashed assets
+ASSET_DIR = 'assets'
+
+# Manifest listing every file of the bundle with its cache policy and precompressed variants
+MANIFEST_NAME = 'manifest.json'
+
+# Text formats served precompressed (images are compressed already)
+PRECOMPRESSED_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg')
+
+# Compression settings of the precompressed variants, the slowest and smallest ones
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Cache policies: hashed assets never change, entry pages and the manifest are revalidated
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+ENTRY_CACHE_CONTROL = 'no-cache'
+
+# Precompressed variants of a file's contents
+def compressed_variants(data):
+    """Return {encoding: (suffix, bytes)} for the encodings that make the data smaller"""
+    variants = {'gzip': ('.gz', gzip.compress(data, GZIP_LEVEL, mtime=0))}
+    if brotli is not None:
+        variants['br'] = ('.br', brotli.compress(data, quality=BROTLI_QUALITY))
+    return {encoding: variant for encoding, variant in variants.items() if len(variant[1]) < len(data)}
+
+# Write a file unless it already holds exactly the given contents
+def _write_if_changed(path, data):
+    """Leave unchanged files untouched, so that syncing the bundle skips them; returns whether it was written"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+# Static report bundle for a plain file server
+class StaticBundle:
+    """Files of the published reports, with content-hashed asset names and precompressed variants
+
+    Assets (charts, stylesheets) are named after their content and cached forever; entry
+    pages keep stable names and are revalidated. finish() writes the manifest and removes
+    the files the previous manifest listed that are no longer part of the bundle, so a
+    rerun only changes the files whose content changed. Files the bundle never wrote are
+    left alone.
+    """
+
+    def __init__(self, directory=BUNDLE_DIR):
+        self.directory = directory
+        self.files = {}
+        self.assets = {}
+        self.previous_files = self._previous_files()
+
+    def _previous_files(self):
+        """Paths listed by the manifest of the previous run, with their precompressed variants"""
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME), encoding='utf-8') as f:
+                files = json.load(f)['files']
+        except (FileNotFoundError, ValueError, KeyError):
+            return set()
+        paths = set(files) | {variant['path'] for entry in files.values() for variant in entry.get('encodings', {}).values()}
+        # Only paths inside the bundle, whatever the manifest says
+        return {path for path in paths
+                if not posixpath.isabs(path) and not posixpath.normpath(path).startswith('..')}
+
+    def add_asset(self, data, name):
+        """Store data as an immutable asset named after name and its content; returns its bundle path"""
+        stem, extension = os.path.splitext(name)
+        stem = re.sub(r'[^\w.-]+', '_', stem)
+        path = posixpath.join(ASSET_DIR, f'{stem}.{hashlib.sha256(data).hexdigest()[:16]}{extension}')
+        if path not in self.files:
+            self._add(path, data, IMMUTABLE_CACHE_CONTROL)
+        return path
+
+    def add_file(self, source, name=None):
+        """Store an existing file (e.g. a chart from the artifact store) as an asset"""
+        name = name or os.path.basename(source)
+        if name not in self.assets:
+            with open(source, 'rb') as f:
+                self.assets[name] = self.add_asset(f.read(), name)
+        return self.assets[name]
+
+    def add_entry(self, path, data):
+        """Store an entry page (or other file) under its stable bundle path"""
+        self._add(path.replace(os.sep, '/'), data, ENTRY_CACHE_CONTROL)
+        return path
+
+    def _add(self, path, data, cache_control):
+        changed = _write_if_changed(os.path.join(self.directory, path), data)
+        entry = {
+            'size': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'cache_control': cache_control,
+            'encodings': {}
+        }
+        if path.endswith(PRECOMPRESSED_EXTENSIONS):
+            previous = self._previous_variants(path) if not changed else None
+            variants = previous if previous is not None else compressed_variants(data)
+            for encoding, (suffix, compressed) in variants.items():
+                if compressed is not None:
+                    _write_if_changed(os.path.join(self.directory, path + suffix), compressed)
+                entry['encodings'][encoding] = {'path': path + suffix, 'size': os.path.getsize(os.path.join(self.directory, path + suffix))}
+        self.files[path] = entry
+
+    def _previous_variants(self, path):
+        """Variants already on disk for unchanged contents, None when one has to be (re)compressed"""
+        suffixes = {'gzip': '.gz', 'br': '.br'} if brotli is not None else {'gzip': '.gz'}
+        if not all(os.path.exists(os.path.join(self.directory, path + suffix)) for suffix in suffixes.values()):
+            return None
+        return {encoding: (suffix, None) for encoding, suffix in suffixes.items()}
+
+    def url(self, path, page_path):
+        """Relative URL of a bundle path from the page at page_path"""
+        return posixpath.relpath(path, posixpath.dirname(page_path.replace(os.sep, '/')) or '.')
+
+    def finish(self):
+        """Write the manifest and delete the previously bundled files no longer part of it; returns the manifest path"""
+        manifest = {'files': self.files, 'assets': self.assets}
+        self._add(MANIFEST_NAME, json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'), ENTRY_CACHE_CONTROL)
+
+        current = set(self.files)
+        current |= {variant['path'] for entry in self.files.values() for variant in entry['encodings'].values()}
+        for path in sorted(self.previous_files - current):
+            try:
+                os.remove(os.path.join(self.directory, *path.split('/')))
+            except FileNotFoundError:
+                pass
+            # Drop the directories this emptied (e.g. the pages of a report no longer paged)
+            parent = posixpath.dirname(path)
+            while parent:
+                parent_dir = os.path.join(self.directory, *parent.split('/'))
+                if not os.path.isdir(parent_dir) or os.listdir(parent_dir):
+                    break
+                os.rmdir(parent_dir)
+                parent = posixpath.dirname(parent)
+        self.previous_files = current
+        return os.path.join(self.directory, MANIFEST_NAME)
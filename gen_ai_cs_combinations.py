@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from gen_ai_cs_cube import CATEGORY_COLUMNS
+
+# Minimum share of companies (overall or within an industry) a combination must reach
+COMBINATION_MIN_SUPPORT = 0.1
+
+# Minimum number of companies behind a combination, however small the industry
+COMBINATION_MIN_COMPANIES = 2
+
+# Number of combinations reported overall and per industry
+TOP_COMBINATIONS = 10
+
+# Industry value of the combinations mined across all industries
+ALL_INDUSTRIES = 'All Industries'
+
+# Number of set bits in every word of an array (np.bitwise_count needs numpy 2)
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:
+    def _popcount(words):
+        return np.unpackbits(words.view(np.uint8), axis=-1).reshape(words.shape + (64,)).sum(axis=-1)
+
+# Number of bits of a bitmap over n companies, whole 64-bit words
+def _padded(n):
+    return -(-n // 64) * 64
+
+# Company x code incidence as one bitmap per category code
+def incidence_bitmaps(table, columns=CATEGORY_COLUMNS):
+    """Turn distinct (Industry, Company, Feature) rows (see profile_table) into bitmaps over companies
+
+    Returns the companies, their industries, the items as (column, code) pairs and a
+    uint64 array holding one row of company bits per item.
+    """
+    split = table['Feature'].str.split(': ', n=1, expand=True)
+    rows = table.assign(Column=split[0], Code=split[1])
+    rows = rows[rows['Column'].isin(columns)]
+    rows = rows.assign(Code=rows['Code'].astype('int64'))
+
+    companies = pd.Index(table['Company'].unique()).sort_values()
+    company_codes = companies.get_indexer(rows['Company'])
+    items = rows[['Column', 'Code']].drop_duplicates()
+    items = items.assign(Order=items['Column'].map(columns.index)).sort_values(['Order', 'Code'])[['Column', 'Code']]
+    item_codes = pd.MultiIndex.from_frame(items).get_indexer(pd.MultiIndex.from_frame(rows[['Column', 'Code']]))
+
+    incidence = np.zeros((len(items), _padded(len(companies))), dtype=bool)
+    incidence[item_codes, company_codes] = True
+    bitmaps = np.packbits(incidence, axis=1).view(np.uint64)
+
+    industries = table.drop_duplicates('Company').set_index('Company')['Industry'].reindex(companies)
+    return companies, industries.to_numpy(dtype=object), list(items.itertuples(index=False, name=None)), bitmaps
+
+# Frequent combinations of items from different columns
+def mine_bitmaps(item_columns, bitmaps, min_count):
+    """Return (item indices, company count) of every combination with at most one item per column
+
+    Level by level, each frequent combination is extended with the items of every later
+    column at once: one AND and popcount over the bitmaps per (column, level), pruning
+    combinations below min_count before they are extended further.
+    """
+    item_columns = np.asarray(item_columns)
+    counts = _popcount(bitmaps).sum(axis=1)
+    frequent = counts >= min_count
+    prefixes = np.flatnonzero(frequent)[:, None]
+    prefix_bitmaps, prefix_counts = bitmaps[frequent], counts[frequent]
+    results = list(zip(map(tuple, prefixes), prefix_counts))
+
+    while len(prefixes):
+        last_columns = item_columns[prefixes[:, -1]]
+        next_prefixes, next_bitmaps, next_counts = [], [], []
+        for column in np.unique(item_columns):
+            extendable = np.flatnonzero(last_columns < column)
+            items = np.flatnonzero(frequent & (item_columns == column))
+            if not len(extendable) or not len(items):
+                continue
+            joint = prefix_bitmaps[extendable, None, :] & bitmaps[None, items, :]
+            joint_counts = _popcount(joint).sum(axis=2)
+            prefix_index, item_index = np.nonzero(joint_counts >= min_count)
+            next_prefixes.append(np.column_stack([prefixes[extendable[prefix_index]], items[item_index]]))
+            next_bitmaps.append(joint[prefix_index, item_index])
+            next_counts.append(joint_counts[prefix_index, item_index])
+        if not next_prefixes:
+            break
+        prefixes = np.concatenate(next_prefixes)
+        prefix_bitmaps, prefix_counts = np.concatenate(next_bitmaps), np.concatenate(next_counts)
+        results += list(zip(map(tuple, prefixes), prefix_counts))
+    return results
+
+# Frequent category combinations overall and per industry
+def frequent_combinations(table, min_support=COMBINATION_MIN_SUPPORT, min_companies=COMBINATION_MIN_COMPANIES,
+                          columns=CATEGORY_COLUMNS):
+    """Mine the combinations of category codes shared by enough distinct companies
+
+    A combination holds at most one code per category column. Support is counted over
+    the companies of all industries and, separately, over each industry's companies.
+    Returns one row per frequent combination with its Industry (ALL_INDUSTRIES for the
+    overall ones), Items ((column, code) pairs), Size, Companies and Support (share).
+    """
+    companies, industries, items, bitmaps = incidence_bitmaps(table, columns)
+    item_columns = [columns.index(column) for column, _ in items]
+
+    # Industries restrict the bitmaps to their own companies
+    groups = [(ALL_INDUSTRIES, np.ones(len(companies), dtype=bool))]
+    groups += [(industry, industries == industry) for industry in pd.unique(industries)]
+
+    rows = []
+    for industry, members in groups:
+        padded = np.zeros(_padded(len(companies)), dtype=bool)
+        padded[:len(companies)] = members
+        mask = np.packbits(padded).view(np.uint64)
+        total = int(members.sum())
+        min_count = max(min_companies, int(np.ceil(min_support * total)))
+        for item_indices, count in mine_bitmaps(item_columns, bitmaps & mask, min_count):
+            rows.append((industry, tuple(items[i] for i in item_indices), len(item_indices), int(count), count / total))
+    return pd.DataFrame(rows, columns=['Industry', 'Items', 'Size', 'Companies', 'Support'])
+
+# Combinations not implied by a larger one
+def closed_combinations(combinations):
+    """Drop every combination that a superset of the same industry matches with the same companies
+
+    If any superset has the same support, so does one with a single code more (support only
+    shrinks as codes are added), and that one is frequent as well, so checking the
+    combinations one code larger is enough.
+    """
+    implied = set()
+    for row in combinations.itertuples():
+        for position in range(row.Size if row.Size > 1 else 0):
+            implied.add((row.Industry, row.Items[:position] + row.Items[position + 1:], row.Companies))
+    keys = zip(combinations['Industry'], combinations['Items'], combinations['Companies'])
+    return combinations[[key not in implied for key in keys]]
+
+# Most common combinations of each industry
+def top_combinations(combinations, n=TOP_COMBINATIONS, min_size=2):
+    """Keep the n closed combinations of at least min_size codes shared by most companies, larger ones first on ties"""
+    combinations = closed_combinations(combinations)
+    combinations = combinations[combinations['Size'] >= min_size]
+    combinations = combinations.sort_values(['Companies', 'Size'], ascending=False, kind='stable')
+    return combinations.groupby('Industry', sort=False).head(n).reset_index(drop=True)
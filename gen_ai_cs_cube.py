@@ -0,0 +1,315 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from gen_ai_cs_preprocess import STORE_PATH, store_view
+from gen_ai_cs_sketch import (SKETCH_RELATIVE_ERROR, HyperLogLog, precision_for_error, grouped_sketches,
+                              merge_sketches, merge_sketch_series, estimate_counts)
+
+# Multi-select category dimensions of the survey, each value has a text label in '<col> Label'
+CATEGORY_COLUMNS = ['Cat 1', 'Cat 2', 'Cat 3', 'Cat 4']
+
+# Single-valued company attributes counted alongside the categories
+ATTRIBUTE_COLUMNS = ['Contact_Party', 'Contact_Type']
+
+# Build the aggregation cube shared by all charts and reports
+def build_cube(df, relative_error=None):
+    """Count distinct companies per (Industry, value) for every category and attribute column
+
+    Every company belongs to exactly one industry, so the distinct-company count for
+    any group of industries is the sum of the per-industry counts (see cube_counts).
+    With a relative_error the counts are approximate, see build_sketch_cube.
+    """
+    if relative_error is not None:
+        return build_sketch_cube(df, relative_error)
+    return cube_from_tables(company_tables(df), list(df['Industry'].unique()), category_labels(df), first_rows(df))
+
+# Reduce the data to the distinct companies behind the cube's cells
+def company_tables(df):
+    """Return the distinct (Industry, Company) rows and, per column, the distinct (Industry, Company, value) rows"""
+    tables = {'companies': df[['Industry', 'Company']].drop_duplicates()}
+    for col in CATEGORY_COLUMNS + ATTRIBUTE_COLUMNS:
+        tables[col] = df[['Industry', 'Company', col]].drop_duplicates()
+    return tables
+
+# Row at which every cube cell first occurs, ordering equal counts like value_counts
+def first_rows(df):
+    """Return, per column, the smallest row label (df.index) of every (Industry, value) pair"""
+    rows = {}
+    for col in CATEGORY_COLUMNS + ATTRIBUTE_COLUMNS:
+        cells = pd.MultiIndex.from_arrays([df['Industry'], df[col]])
+        rows[col] = pd.Series(np.asarray(df.index), index=cells).groupby(level=['Industry', col]).min()
+    return rows
+
+# Count the distinct company tables into a cube
+def cube_from_tables(tables, industries, labels, first):
+    cube = {
+        'industries': industries,
+        'companies': tables['companies']['Industry'].value_counts(),
+        'labels': labels,
+        'first_rows': first
+    }
+
+    for col in CATEGORY_COLUMNS + ATTRIBUTE_COLUMNS:
+        cube[col] = tables[col].groupby(['Industry', col]).size()
+
+    return cube
+
+# Build the aggregation cube from distinct-count sketches
+def build_sketch_cube(df, relative_error=SKETCH_RELATIVE_ERROR):
+    """Keep a HyperLogLog sketch of the companies in every cube cell instead of exact sets
+
+    The cube holds the sketches under 'sketches' and their relative standard error under
+    'relative_error'; the count series hold the sketches' estimates. Groups of industries
+    are counted by merging sketches, which stays correct when companies repeat across
+    shards or snapshots.
+    """
+    sketches = cell_sketches(df, precision_for_error(relative_error))
+    return cube_from_sketches(sketches, list(df['Industry'].unique()), category_labels(df), first_rows(df))
+
+# Sketch the companies of every cube cell
+def cell_sketches(df, precision):
+    sketches = {'companies': grouped_sketches(df, ['Industry'], 'Company', precision)}
+    for col in CATEGORY_COLUMNS + ATTRIBUTE_COLUMNS:
+        sketches[col] = grouped_sketches(df, ['Industry', col], 'Company', precision)
+    return sketches
+
+# Estimate the cube's counts from its cell sketches
+def cube_from_sketches(sketches, industries, labels, first):
+    # Industries by company count, ties in order of appearance like value_counts
+    companies = estimate_counts(sketches['companies']).reindex(industries).rename('count')
+
+    cube = {
+        'industries': industries,
+        'companies': companies.sort_values(ascending=False, kind='stable'),
+        'labels': labels,
+        'first_rows': first,
+        'sketches': sketches,
+        'relative_error': HyperLogLog(sketches['companies'].iloc[0].precision).relative_error
+    }
+    for col in CATEGORY_COLUMNS + ATTRIBUTE_COLUMNS:
+        cube[col] = estimate_counts(sketches[col])
+
+    return cube
+
+# Partial aggregates of one shard of the data
+def partial_cube(df, relative_error=None):
+    """Reduce a shard to the mergeable state behind its cube: distinct company tables, or cell sketches"""
+    partial = {'industries': list(df['Industry'].unique()), 'labels': category_labels(df),
+               'first_rows': first_rows(df), 'rows': len(df)}
+    if relative_error is not None:
+        partial['sketches'] = cell_sketches(df, precision_for_error(relative_error))
+    else:
+        partial['tables'] = company_tables(df)
+    return partial
+
+# Merge the partial aggregates of several shards into the global cube
+def merge_partial_cubes(*partials, global_rows=False):
+    """Combine shard partials (see partial_cube) into the cube of all their data
+
+    Companies appearing in several shards are counted once, exactly from the distinct
+    tables or approximately by merging sketches. Shards number their rows from 0 and
+    follow each other; partials of segments of one table (global_rows) keep its row labels.
+    """
+    industries = list(dict.fromkeys(industry for partial in partials for industry in partial['industries']))
+    labels = {col: {code: label for partial in partials for code, label in partial['labels'][col].items()}
+              for col in CATEGORY_COLUMNS}
+    offsets = np.zeros(len(partials), dtype=np.int64)
+    if not global_rows:
+        offsets[1:] = np.cumsum([partial['rows'] for partial in partials[:-1]])
+    first = {col: pd.concat([partial['first_rows'][col] + offset for partial, offset in zip(partials, offsets)])
+                    .groupby(level=['Industry', col]).min()
+             for col in CATEGORY_COLUMNS + ATTRIBUTE_COLUMNS}
+
+    if all('sketches' in partial for partial in partials):
+        sketches = {key: merge_sketch_series([partial['sketches'][key] for partial in partials])
+                    for key in partials[0]['sketches']}
+        return cube_from_sketches(sketches, industries, labels, first)
+    if any('sketches' in partial for partial in partials):
+        raise ValueError("Cannot merge exact and approximate partial cubes")
+
+    tables = {key: pd.concat([partial['tables'][key] for partial in partials], ignore_index=True).drop_duplicates()
+              for key in partials[0]['tables']}
+    return cube_from_tables(tables, industries, labels, first)
+
+# Read-only connection to the embedded store
+def connect_store(path=STORE_PATH):
+    return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+
+# Build the aggregation cube from the store's distinct-count views
+def cube_from_store(path=STORE_PATH):
+    """Query the same cube as build_cube from the store written by write_store
+
+    Counts come from the store's views, answered from its indexes; only the
+    aggregated rows are loaded.
+    """
+    with connect_store(path) as conn:
+        # Industries and labels in order of first appearance, like unique() and drop_duplicates()
+        industries = [row[0] for row in conn.execute('SELECT Industry FROM data GROUP BY Industry ORDER BY MIN(rowid)')]
+        labels = {col: dict(conn.execute(f'SELECT "{col}", "{col} Label" FROM data '
+                                         f'GROUP BY "{col}", "{col} Label" ORDER BY MIN(rowid)'))
+                  for col in CATEGORY_COLUMNS}
+
+        # Industries by company count, ties in order of appearance like value_counts
+        companies = pd.read_sql('SELECT Industry, companies FROM industry_companies', conn, index_col='Industry')
+        companies = companies['companies'].rename('count').reindex(industries)
+        cube = {
+            'industries': industries,
+            'companies': companies.sort_values(ascending=False, kind='stable'),
+            'labels': labels,
+            'first_rows': {}
+        }
+
+        for col in CATEGORY_COLUMNS + ATTRIBUTE_COLUMNS:
+            counts = pd.read_sql(f'SELECT Industry, value, companies FROM "{store_view(col)}" ORDER BY Industry, value', conn)
+            cube[col] = counts.set_index(['Industry', 'value'])['companies'].rename_axis(['Industry', col]).rename(None)
+
+            # Answered from the column's index, which holds the rowid of every entry
+            first = pd.read_sql(f'SELECT Industry, "{col}" AS value, MIN(rowid) - 1 AS row FROM data '
+                                f'WHERE "{col}" IS NOT NULL GROUP BY "{col}", Industry ORDER BY Industry, value', conn)
+            cube['first_rows'][col] = first.set_index(['Industry', 'value'])['row'].rename_axis(['Industry', col])
+    conn.close()
+    return cube
+
+# Distinct companies behind every pair of category values
+def pair_tables(df, category_pairs):
+    """Return, per (cat1, cat2) pair, the distinct (Industry, Company, codes, labels) rows counted by heatmaps"""
+    tables = {}
+    for cat1, cat2 in category_pairs:
+        columns = ['Industry', 'Company', f'Cat {cat1}', f'Cat {cat2}', f'Cat {cat1} Label', f'Cat {cat2} Label']
+        tables[(cat1, cat2)] = df[columns].drop_duplicates()
+    return tables
+
+# Pair tables queried from the store
+def store_pair_tables(category_pairs, path=STORE_PATH):
+    """Return the same tables as pair_tables, made distinct by the store
+
+    Rows keep their first CSV position as index, like drop_duplicates.
+    """
+    tables = {}
+    with connect_store(path) as conn:
+        for cat1, cat2 in category_pairs:
+            columns = ', '.join(f'"{col}"' for col in ['Industry', 'Company', f'Cat {cat1}', f'Cat {cat2}',
+                                                         f'Cat {cat1} Label', f'Cat {cat2} Label'])
+            tables[(cat1, cat2)] = pd.read_sql(f'SELECT MIN(rowid) - 1 AS row, {columns} FROM data '
+                                               f'GROUP BY {columns} ORDER BY row', conn, index_col='row').rename_axis(None)
+    conn.close()
+    return tables
+
+# Merge the pair tables of several shards
+def merge_pair_tables(*partials):
+    return {pair: pd.concat([partial[pair] for partial in partials], ignore_index=True).drop_duplicates()
+            for pair in partials[0]}
+
+# Category code -> label lookups
+def category_labels(df):
+    labels = {}
+    for col in CATEGORY_COLUMNS:
+        label_mapping = df[[col, f'{col} Label']].drop_duplicates()
+        labels[col] = dict(zip(label_mapping[col], label_mapping[f'{col} Label']))
+    return labels
+
+# Select the industries of a cube series
+def _filter_industries(series, industries=None, exclude=None):
+    industry_level = series.index.get_level_values('Industry')
+    if industries is not None:
+        series = series[industry_level.isin(industries)]
+        industry_level = series.index.get_level_values('Industry')
+    if exclude is not None:
+        series = series[~industry_level.isin(exclude)]
+    return series
+
+# Distinct-company counts of one column over a group of industries
+def cube_counts(cube, col, industries=None, exclude=None):
+    """Return distinct-company counts per value of col, summed over the selected industries"""
+    if 'sketches' in cube:
+        sketches = _filter_industries(cube['sketches'][col], industries, exclude)
+        merged = {value: merge_sketches(group) for value, group in sketches.groupby(level=col)}
+        return estimate_counts(pd.Series(merged, dtype=object).rename_axis(col)).sort_index()
+
+    counts = _filter_industries(cube[col], industries, exclude)
+    return counts.groupby(level=col).sum().sort_index()
+
+# Number of distinct companies in a group of industries
+def cube_companies(cube, industries=None, exclude=None):
+    """Return the number of distinct companies in the selected industries"""
+    if 'sketches' in cube:
+        sketches = _filter_industries(cube['sketches']['companies'], industries, exclude)
+        return int(round(merge_sketches(sketches).estimate())) if len(sketches) else 0
+
+    companies = _filter_industries(cube['companies'].rename_axis('Industry'), industries, exclude)
+    return int(companies.sum())
+
+# Part of the cube a stage reads
+def cube_slice(cube, industries=None, columns=CATEGORY_COLUMNS + ATTRIBUTE_COLUMNS):
+    """Return the company counts and the cells of the given columns, for the given industries only
+
+    cube_counts and cube_companies count a slice like the full cube for those industries.
+    """
+    sliced = {
+        'industries': cube['industries'] if industries is None else list(industries),
+        'companies': _filter_industries(cube['companies'].rename_axis('Industry'), industries),
+        'labels': {col: labels for col, labels in cube['labels'].items() if col in columns},
+        'first_rows': {col: _filter_industries(cube['first_rows'][col], industries) for col in columns}
+    }
+    for col in columns:
+        sliced[col] = _filter_industries(cube[col], industries)
+    if 'sketches' in cube:
+        sliced['sketches'] = {key: _filter_industries(cube['sketches'][key], industries) for key in ['companies'] + list(columns)}
+        sliced['relative_error'] = cube['relative_error']
+    return sliced
+
+# All industries in the cube, in order of appearance in the data
+def cube_industries(cube):
+    return cube['industries']
+
+# Share, difference, lift and rank of every value of a column in every industry
+def category_lift(cube, col):
+    """Compare each industry's distinct-company counts of col with those of all other industries
+
+    Returns a frame indexed by (Industry, value) with the value's count and company_share
+    (of the industry's companies), its share of the industry's counts, the same three
+    figures over the rest of the industries, the share difference, the lift (share over
+    rest share) and the value's rank within the industry and within the rest (1 = most
+    companies, ties going to the value seen first in the data, like value_counts).
+    Rest figures are sums of per-industry counts, as in cube_counts.
+    """
+    counts = cube[col].unstack(col, fill_value=0).reindex(cube_industries(cube), fill_value=0)
+    values = counts.to_numpy(dtype=np.int64)
+    rest = values.sum(axis=0) - values
+    companies = cube['companies'].reindex(counts.index, fill_value=0).to_numpy()
+    rest_companies = companies.sum() - companies
+
+    # First row of every value in each industry, and in the rest (the earliest of the other industries)
+    first = (cube['first_rows'][col].unstack(col).reindex(index=counts.index, columns=counts.columns)
+             .to_numpy(dtype=float, na_value=np.inf))
+    earliest = np.sort(first, axis=0)
+    runner_up = earliest[1] if len(first) > 1 else np.full(first.shape[1], np.inf)
+    rest_first = np.where(first == earliest[0], runner_up, earliest[0])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = values / values.sum(axis=1, keepdims=True)
+        rest_share = rest / rest.sum(axis=1, keepdims=True)
+        profile = {
+            'count': values,
+            'company_share': values / companies[:, None],
+            'share': share,
+            'rest_count': rest,
+            'rest_company_share': rest / rest_companies[:, None],
+            'rest_share': rest_share,
+            'difference': share - rest_share,
+            'lift': share / rest_share,
+            'rank': np.lexsort((first, -values)).argsort(axis=1) + 1,
+            'rest_rank': np.lexsort((rest_first, -rest)).argsort(axis=1) + 1
+        }
+
+    index = pd.MultiIndex.from_product([counts.index, counts.columns], names=['Industry', col])
+    return pd.DataFrame({name: matrix.ravel() for name, matrix in profile.items()}, index=index)
+
+# Most common value of a column in every industry
+def top_values(lift):
+    """Return the rank-1 value per industry from a category_lift frame, skipping industries without counts"""
+    col = lift.index.names[1]
+    tops = lift[(lift['rank'] == 1) & (lift['count'] > 0)]
+    return tops.reset_index(level=col)[col]
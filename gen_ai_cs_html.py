@@ -1,71 +1,33 @@
+import argparse
 import numpy as np
 import os
+import posixpath
 import pandas as pd
 import matplotlib.pyplot as plt
 import plotly.express as px
-from jinja2 import Template
+from jinja2 import Environment
+from gen_ai_cs_images import ReportImages, artifact_path
+from gen_ai_cs_bundle import ASSET_DIR, BUNDLE_DIR, StaticBundle
+from gen_ai_cs_analysis import DEFAULT_FOCUS_INDUSTRY, industry_key
+from gen_ai_cs_cube import cube_industries, category_lift, top_values
+from gen_ai_cs_combinations import ALL_INDUSTRIES, top_combinations
 
-# Load the visualization data
-basic_stats = np.load('gen_ai_cs_viz/basic_stats.npy', allow_pickle=True).item()
-all_industry_spider_charts = np.load('gen_ai_cs_viz/all_industry_spider_charts.npy', allow_pickle=True).item()
-per_industry_spider_charts = np.load('gen_ai_cs_viz/per_industry_spider_charts.npy', allow_pickle=True).item()
-heatmaps = np.load('gen_ai_cs_viz/heatmaps.npy', allow_pickle=True).item()
-telco_insights = np.load('gen_ai_cs_viz/telco_insights.npy', allow_pickle=True).item()
+# Companies listed with their peers per industry, the ones with the closest peers first
+PEER_TABLE_COMPANIES = 10
 
-# Load the original data for additional insights
-df = pd.read_csv('tableau_ready_data.csv')
-
-# Generate insights about the data
-def generate_insights():
+# Generate insights about the data shared by every focus industry's report
+def generate_insights(pair_tables, cube, peers, combinations):
     insights = {}
     
-    # Separate Telco and non-Telco data
-    telco_df = df[df['Industry'] == 'Telco']
-    non_telco_df = df[df['Industry'] != 'Telco']
-    
-    # Get unique company-category combinations for accurate counting
-    # For all industries except Telco
-    cat1_company = non_telco_df[['Company', 'Cat 1', 'Cat 1 Label']].drop_duplicates()
-    cat2_company = non_telco_df[['Company', 'Cat 2', 'Cat 2 Label']].drop_duplicates()
-    cat3_company = non_telco_df[['Company', 'Cat 3', 'Cat 3 Label']].drop_duplicates()
-    cat4_company = non_telco_df[['Company', 'Cat 4', 'Cat 4 Label']].drop_duplicates()
-    
-    # For Telco industry
-    telco_cat1_company = telco_df[['Company', 'Cat 1', 'Cat 1 Label']].drop_duplicates()
-    telco_cat2_company = telco_df[['Company', 'Cat 2', 'Cat 2 Label']].drop_duplicates()
-    telco_cat3_company = telco_df[['Company', 'Cat 3', 'Cat 3 Label']].drop_duplicates()
-    telco_cat4_company = telco_df[['Company', 'Cat 4', 'Cat 4 Label']].drop_duplicates()
-    
-    # Categories frequency insights for all industries except Telco
-    insights['cat1_top'] = cat1_company['Cat 1 Label'].value_counts().index[0] if not cat1_company.empty else "N/A"
-    insights['cat2_top'] = cat2_company['Cat 2 Label'].value_counts().index[0] if not cat2_company.empty else "N/A"
-    insights['cat3_top'] = cat3_company['Cat 3 Label'].value_counts().index[0] if not cat3_company.empty else "N/A"
-    insights['cat4_top'] = cat4_company['Cat 4 Label'].value_counts().index[0] if not cat4_company.empty else "N/A"
-    
-    # Categories frequency insights for Telco
-    insights['telco_cat1_top'] = telco_cat1_company['Cat 1 Label'].value_counts().index[0] if not telco_cat1_company.empty else "N/A"
-    insights['telco_cat2_top'] = telco_cat2_company['Cat 2 Label'].value_counts().index[0] if not telco_cat2_company.empty else "N/A"
-    insights['telco_cat3_top'] = telco_cat3_company['Cat 3 Label'].value_counts().index[0] if not telco_cat3_company.empty else "N/A"
-    insights['telco_cat4_top'] = telco_cat4_company['Cat 4 Label'].value_counts().index[0] if not telco_cat4_company.empty else "N/A"
-    
-    # Industry specific insights
+    # Industry specific insights, from the most common value of each category in every industry
+    tops = {cat_num: top_values(category_lift(cube, f'Cat {cat_num}')) for cat_num in range(1, 5)}
     industry_insights = {}
-    for industry in df['Industry'].unique():
-        industry_df = df[df['Industry'] == industry]
-        
-        # Get unique companies for this industry with each category
-        ind_cat1_company = industry_df[['Company', 'Cat 1', 'Cat 1 Label']].drop_duplicates()
-        ind_cat2_company = industry_df[['Company', 'Cat 2', 'Cat 2 Label']].drop_duplicates()
-        ind_cat3_company = industry_df[['Company', 'Cat 3', 'Cat 3 Label']].drop_duplicates()
-        ind_cat4_company = industry_df[['Company', 'Cat 4', 'Cat 4 Label']].drop_duplicates()
-        
+    for industry in cube_industries(cube):
         # Only add to insights if there's data for this industry
-        if not ind_cat1_company.empty and not ind_cat2_company.empty and not ind_cat3_company.empty and not ind_cat4_company.empty:
+        if all(industry in industry_tops.index for industry_tops in tops.values()):
             industry_insights[industry] = {
-                'cat1_top': ind_cat1_company['Cat 1 Label'].value_counts().index[0],
-                'cat2_top': ind_cat2_company['Cat 2 Label'].value_counts().index[0],
-                'cat3_top': ind_cat3_company['Cat 3 Label'].value_counts().index[0],
-                'cat4_top': ind_cat4_company['Cat 4 Label'].value_counts().index[0],
+                f'cat{cat_num}_top': cube['labels'][f'Cat {cat_num}'][industry_tops[industry]]
+                for cat_num, industry_tops in tops.items()
             }
     
     insights['industry_insights'] = industry_insights
@@ -76,6 +38,7 @@ def generate_insights():
     
     for cat1, cat2 in cat_pairs:
         # Get unique company combinations for these two categories
+        df = pair_tables[(cat1, cat2)]
         company_cats = df[['Company', f'Cat {cat1}', f'Cat {cat2}']].drop_duplicates()
         
         # Create crosstab with unique company-category combinations
@@ -106,13 +69,40 @@ def generate_insights():
     
     insights['correlation_insights'] = correlation_insights
     
-    # Add Telco vs Other industries insights
-    insights.update(telco_insights)
+    # Most similar companies of the companies with the closest peers in every industry, listed with their industry
+    closest = peers[peers['Rank'] == 1].sort_values(['Similarity', 'Company'], ascending=[False, True])
+    shown = closest.groupby('Industry', sort=False).head(PEER_TABLE_COMPANIES)['Company']
+    industry_peers = {}
+    for (industry, company), company_peers in peers[peers['Company'].isin(shown)].groupby(['Industry', 'Company'], sort=False):
+        industry_peers.setdefault(industry, []).append({
+            'company': company,
+            'peers': [{'company': row['Peer'], 'industry': row['Peer Industry'], 'similarity': round(row['Similarity'] * 100)}
+                      for _, row in company_peers.sort_values('Rank').iterrows()]
+        })
+    insights['industry_peers'] = industry_peers
+    insights['industry_peer_companies'] = closest['Industry'].value_counts().to_dict()
+    
+    # Most common combinations of category values, across all industries and within each
+    combination_insights = {}
+    for row in top_combinations(combinations).itertuples():
+        combination_insights.setdefault(row.Industry, []).append({
+            'labels': [cube['labels'][col][code] for col, code in row.Items],
+            'companies': row.Companies,
+            'share': round(row.Support * 100)
+        })
+    insights['combination_insights'] = combination_insights
+    insights['all_industries'] = ALL_INDUSTRIES
+    
+    # Relative standard error of the cube's counts when they come from sketches
+    insights['count_error'] = cube.get('relative_error')
     
     return insights
 
-# Generate insights
-insights = generate_insights()
+# Report file for a focus industry, the default focus keeps the historical name
+def report_filename(focus_industry):
+    if focus_industry == DEFAULT_FOCUS_INDUSTRY:
+        return 'gen_ai_customer_service_analysis.html'
+    return f'gen_ai_customer_service_analysis_{industry_key(focus_industry)}.html'
 
 # Create the HTML template
 html_template = """
@@ -121,7 +111,7 @@ html_template = """
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>GenAI in Customer Service Analysis</title>
+    <title>GenAI in Customer Service Analysis - {{ focus_industry }}</title>
     <style>
         :root {
             --primary-color: rgb(112, 48, 160);
@@ -212,10 +202,14 @@ html_template = """
             transform: translateY(-5px);
         }
         
-        .viz-card img {
+        .viz-card .chart-image {
             width: 100%;
-            height: auto;
             display: block;
+            background-size: contain;
+            background-repeat: no-repeat;
+            /* Charts are backgrounds, which browsers leave out when printing unless told otherwise */
+            -webkit-print-color-adjust: exact;
+            print-color-adjust: exact;
         }
         
         .viz-card-content {
@@ -230,6 +224,26 @@ html_template = """
             border-radius: 0 8px 8px 0;
         }
         
+        .lazy-fragment {
+            margin-top: 20px;
+        }
+        
+        .lazy-fragment summary {
+            cursor: pointer;
+            font-weight: bold;
+            color: var(--primary-color);
+        }
+        
+        .back-link a {
+            color: var(--primary-color);
+        }
+        
+        .count-note {
+            font-size: 0.9em;
+            font-style: italic;
+            color: #666;
+        }
+        
         .basic-stats {
             display: flex;
             flex-wrap: wrap;
@@ -289,8 +303,101 @@ html_template = """
             }
         }
     </style>
+    {% if chart_stylesheet %}
+    <link rel="stylesheet" class="chart-images" href="{{ chart_stylesheet }}">
+    {% else %}
+    <style class="chart-images">
+        /* Each distinct chart image is embedded once and shared through its class */
+        {% for rule in images.css_rules() %}
+        {{ rule }}
+        {% endfor %}
+    </style>
+    {% endif %}
 </head>
 <body>
+    {# Chart grids, rendered inline in the single-page report and as fragment pages in the paged one #}
+    {% macro overall_charts() %}
+            <div class="viz-container">
+                {% for cat_num in range(1, 5) %}
+                <div class="viz-card">
+                    <div class="chart-image {{ images.css_class(all_industry_spider_charts['all_industries_Cat ' + cat_num|string]) }}" role="img" aria-label="Spider Chart for Category {{ cat_num }}"></div>
+                    <div class="viz-card-content">
+                        <p>Frequency distribution of different values in Category {{ cat_num }} across all industries except {{ focus_industry }}.</p>
+                    </div>
+                </div>
+                {% endfor %}
+            </div>
+    {% endmacro %}
+    
+    {% macro comparison_charts() %}
+            <div class="viz-container">
+                {% for cat_num in range(1, 5) %}
+                <div class="viz-card">
+                    <div class="chart-image {{ images.css_class(all_industry_spider_charts['focus_vs_others_Cat ' + cat_num|string]) }}" role="img" aria-label="{{ focus_industry }} vs Others Ratio Chart for Category {{ cat_num }}"></div>
+                    <div class="viz-card-content">
+                        <p>Ratio comparison of Category {{ cat_num }} values between {{ focus_industry }} (purple) and other industries (pink).</p>
+                    </div>
+                </div>
+                {% endfor %}
+            </div>
+    {% endmacro %}
+    
+    {% macro industry_charts(industry) %}
+            {% set charts = per_industry_spider_charts[industry] %}
+            <div class="viz-container">
+                {% for cat_num in range(1, 5) %}
+                <div class="viz-card">
+                    <div class="chart-image {{ images.css_class(charts['cat_' + cat_num|string]) }}" role="img" aria-label="Spider Chart for {{ industry }} - Category {{ cat_num }}"></div>
+                    <div class="viz-card-content">
+                        <p>Distribution of Category {{ cat_num }} values specific to the {{ industry }} industry.</p>
+                    </div>
+                </div>
+                {% endfor %}
+            </div>
+    {% endmacro %}
+    
+    {% macro heatmap_charts() %}
+            <div class="viz-container">
+                {% for key, img in heatmaps.items() %}
+                <div class="viz-card">
+                    <div class="chart-image {{ images.css_class(img) }}" role="img" aria-label="Heatmap for {{ key }}"></div>
+                    <div class="viz-card-content">
+                        {% set cats = key.split('_') %}
+                        <p>Correlation between {{ cats[0]|replace('cat', 'Category ') }} and {{ cats[1]|replace('cat', 'Category ') }} across all industries.</p>
+                    </div>
+                </div>
+                {% endfor %}
+            </div>
+    {% endmacro %}
+    
+    {% macro focus_heatmap_charts() %}
+            <div class="viz-container">
+                {% for key, img in focus_heatmaps.items() %}
+                <div class="viz-card">
+                    <div class="chart-image {{ images.css_class(img) }}" role="img" aria-label="Heatmap for {{ focus_industry }} {{ key }}"></div>
+                    <div class="viz-card-content">
+                        {% set cats = key.split('_') %}
+                        <p>Correlation between {{ cats[0]|replace('cat', 'Category ') }} and {{ cats[1]|replace('cat', 'Category ') }} in the {{ focus_industry }} industry.</p>
+                    </div>
+                </div>
+                {% endfor %}
+            </div>
+    {% endmacro %}
+    
+    {# Inline charts, or on the paged index a placeholder fetching them when opened #}
+    {% macro chart_block(name, label) %}
+            {% if page is none %}
+            {{ caller() }}
+            {% else %}
+            <details class="lazy-fragment" data-src="{{ page_files[name] }}">
+                <summary>{{ label }}</summary>
+                <div class="fragment-body">
+                    <p><a href="{{ page_files[name] }}">Open {{ label|lower }}</a></p>
+                </div>
+            </details>
+            {% endif %}
+    {% endmacro %}
+    
     <header>
         <div class="container">
             <h1>GenAI in Customer Service Analysis</h1>
@@ -299,6 +406,17 @@ html_template = """
     </header>
     
     <div class="container">
+        {% if page is not none and page != 'index' %}
+        <p class="back-link"><a href="{{ page_files['index'] }}">&larr; Back to the report</a></p>
+        <main class="fragment">
+            {% if page == 'overall' %}{{ overall_charts() }}
+            {% elif page == 'comparison' %}{{ comparison_charts() }}
+            {% elif page == 'heatmaps' %}{{ heatmap_charts() }}
+            {% elif page == 'focus_heatmaps' %}{{ focus_heatmap_charts() }}
+            {% else %}{{ industry_charts(page_industry) }}
+            {% endif %}
+        </main>
+        {% else %}
         <section>
             <h2 class="section-title">Project Overview</h2>
             <p>This analysis explores the application of GenAI tools in customer service across different industries. The data has been categorized along four dimensions:</p>
@@ -311,12 +429,19 @@ html_template = """
             
             <div class="insight-box">
                 <h3>Key Findings</h3>
-                <p>The most common use case across all industries is <strong>{{ insights.cat1_top }}</strong> for Problem-Solution, utilizing <strong>{{ insights.cat2_top }}</strong> technology, primarily enhancing the <strong>{{ insights.cat3_top }}</strong> stage of the customer journey, with <strong>{{ insights.cat4_top }}</strong> being the dominant data modality.</p>
+                <p>The most common use case across all industries is <strong>{{ insights.non_focus_cat1_top }}</strong> for Problem-Solution, utilizing <strong>{{ insights.non_focus_cat2_top }}</strong> technology, primarily enhancing the <strong>{{ insights.non_focus_cat3_top }}</strong> stage of the customer journey, with <strong>{{ insights.non_focus_cat4_top }}</strong> being the dominant data modality.</p>
             </div>
         </section>
         
+        {% set count_note %}
+            {% if insights.count_error %}
+            <p class="count-note">Company counts, percentages and spider charts in this report are HyperLogLog estimates with a relative standard error of &plusmn;{{ '%.1f' | format(insights.count_error * 100) }}% (about 95% of figures lie within &plusmn;{{ '%.1f' | format(insights.count_error * 200) }}%). Heatmaps show exact counts.</p>
+            {% endif %}
+        {% endset %}
+        
         <section>
             <h2 class="section-title">Basic Statistics</h2>
+            {{ count_note }}
             <div class="basic-stats">
                 <div class="stat-card">
                     <h3>Industry Distribution</h3>
@@ -379,7 +504,7 @@ html_template = """
                 </div>
                 
                 <div class="stat-card">
-                    <h3>Telco Industry Statistics</h3>
+                    <h3>{{ focus_industry }} Industry Statistics</h3>
                     <table>
                         <thead>
                             <tr>
@@ -390,19 +515,19 @@ html_template = """
                         <tbody>
                             <tr>
                                 <td>Problem-Solution</td>
-                                <td>{{ insights.telco_cat1_top }}</td>
+                                <td>{{ insights.focus_cat1_top }}</td>
                             </tr>
                             <tr>
                                 <td>AI Technology</td>
-                                <td>{{ insights.telco_cat2_top }}</td>
+                                <td>{{ insights.focus_cat2_top }}</td>
                             </tr>
                             <tr>
                                 <td>Customer Journey</td>
-                                <td>{{ insights.telco_cat3_top }}</td>
+                                <td>{{ insights.focus_cat3_top }}</td>
                             </tr>
                             <tr>
                                 <td>Data Modality</td>
-                                <td>{{ insights.telco_cat4_top }}</td>
+                                <td>{{ insights.focus_cat4_top }}</td>
                             </tr>
                         </tbody>
                     </table>
@@ -412,48 +537,31 @@ html_template = """
         
         <section>
             <h2 class="section-title">1. Overall Summary - Spider Web Charts by Category</h2>
-            <p>These spider web charts show the distribution of each category across all industries except Telco in the dataset.</p>
+            <p>These spider web charts show the distribution of each category across all industries except {{ focus_industry }} in the dataset.</p>
+            {{ count_note }}
             
-            <div class="viz-container">
-                {% for cat_num in range(1, 5) %}
-                <div class="viz-card">
-                    <img src="data:image/png;base64,{{ all_industry_spider_charts['all_industries_Cat ' + cat_num|string] }}" alt="Spider Chart for Category {{ cat_num }}">
-                    <div class="viz-card-content">
-                        <p>Frequency distribution of different values in Category {{ cat_num }} across all industries except Telco.</p>
-                    </div>
-                </div>
-                {% endfor %}
-            </div>
+            {% call chart_block('overall', 'Spider charts across all industries') %}{{ overall_charts() }}{% endcall %}
             
             <div class="insight-box">
                 <h3>Overall Category Distribution Insights</h3>
-                <p>Across all industries (excluding Telco), we observe that "{{ insights.cat1_top }}" dominates in Problem-Solution (Category 1), while "{{ insights.cat2_top }}" is the most prevalent AI Technology (Category 2). For Customer Journey stages (Category 3), "{{ insights.cat3_top }}" shows the highest presence, and "{{ insights.cat4_top }}" is the most common Data Modality (Category 4).</p>
+                <p>Across all industries (excluding {{ focus_industry }}), we observe that "{{ insights.non_focus_cat1_top }}" dominates in Problem-Solution (Category 1), while "{{ insights.non_focus_cat2_top }}" is the most prevalent AI Technology (Category 2). For Customer Journey stages (Category 3), "{{ insights.non_focus_cat3_top }}" shows the highest presence, and "{{ insights.non_focus_cat4_top }}" is the most common Data Modality (Category 4).</p>
             </div>
             
-            <h3>Telco vs. Other Industries Comparison</h3>
-            <p>These ratio-based spider charts compare the distribution of categories between Telco and other industries, normalized by the number of use cases.</p>
+            <h3>{{ focus_industry }} vs. Other Industries Comparison</h3>
+            <p>These ratio-based spider charts compare the distribution of categories between {{ focus_industry }} and other industries, normalized by the number of use cases.</p>
             
-            <div class="viz-container">
-                {% for cat_num in range(1, 5) %}
-                <div class="viz-card">
-                    <img src="data:image/png;base64,{{ all_industry_spider_charts['telco_vs_others_Cat ' + cat_num|string] }}" alt="Telco vs Others Ratio Chart for Category {{ cat_num }}">
-                    <div class="viz-card-content">
-                        <p>Ratio comparison of Category {{ cat_num }} values between Telco (purple) and other industries (pink).</p>
-                    </div>
-                </div>
-                {% endfor %}
-            </div>
+            {% call chart_block('comparison', 'Ratio comparison charts') %}{{ comparison_charts() }}{% endcall %}
             
             <div class="insight-box">
-                <h3>Telco vs. Other Industries Insights</h3>
-                <p>When comparing Telco to other industries, we observe that "{{ insights.telco_cat1_top }}" is the most prevalent in Problem-Solution for Telco (vs. "{{ insights.non_telco_cat1_top }}" for other industries). In AI Technology, Telco predominantly uses "{{ insights.telco_cat2_top }}" (vs. "{{ insights.non_telco_cat2_top }}" elsewhere).</p>
-                <p>For Customer Journey stages, Telco focuses on "{{ insights.telco_cat3_top }}" (vs. "{{ insights.non_telco_cat3_top }}" in other industries), while "{{ insights.telco_cat4_top }}" is the dominant Data Modality in Telco (vs. "{{ insights.non_telco_cat4_top }}" in other sectors).</p>
+                <h3>{{ focus_industry }} vs. Other Industries Insights</h3>
+                <p>When comparing {{ focus_industry }} to other industries, we observe that "{{ insights.focus_cat1_top }}" is the most prevalent in Problem-Solution for {{ focus_industry }} (vs. "{{ insights.non_focus_cat1_top }}" for other industries). In AI Technology, {{ focus_industry }} predominantly uses "{{ insights.focus_cat2_top }}" (vs. "{{ insights.non_focus_cat2_top }}" elsewhere).</p>
+                <p>For Customer Journey stages, {{ focus_industry }} focuses on "{{ insights.focus_cat3_top }}" (vs. "{{ insights.non_focus_cat3_top }}" in other industries), while "{{ insights.focus_cat4_top }}" is the dominant Data Modality in {{ focus_industry }} (vs. "{{ insights.non_focus_cat4_top }}" in other sectors).</p>
                 
-                <h4>Most Distinctive Aspects of Telco</h4>
+                <h4>Most Distinctive Aspects of {{ focus_industry }}</h4>
                 <ul>
                     {% for cat_num in range(1, 5) %}
-                    {% if insights['telco_distinctive_cat' + cat_num|string] != "None" and insights['telco_distinctive_cat' + cat_num|string + '_diff'] > 0 %}
-                    <li><strong>Category {{ cat_num }}:</strong> "{{ insights['telco_distinctive_cat' + cat_num|string] }}" is {{ insights['telco_distinctive_cat' + cat_num|string + '_diff'] }}% more common in Telco than in other industries.</li>
+                    {% if insights['focus_distinctive_cat' + cat_num|string] != "None" and insights['focus_distinctive_cat' + cat_num|string + '_diff'] > 0 %}
+                    <li><strong>Category {{ cat_num }}:</strong> "{{ insights['focus_distinctive_cat' + cat_num|string] }}" is {{ insights['focus_distinctive_cat' + cat_num|string + '_diff'] }}% more common in {{ focus_industry }} than in other industries.</li>
                     {% endif %}
                     {% endfor %}
                 </ul>
@@ -462,45 +570,35 @@ html_template = """
         
         <section>
             <h2 class="section-title">2. Industry-Specific Spider Web Charts</h2>
+            {{ count_note }}
             
-            {% if 'Telco' in per_industry_spider_charts %}
-            <h3>Telco</h3>
-            <div class="viz-container">
-                {% for cat_num in range(1, 5) %}
-                <div class="viz-card">
-                    <img src="data:image/png;base64,{{ per_industry_spider_charts['Telco']['cat_' + cat_num|string] }}" alt="Spider Chart for Telco - Category {{ cat_num }}">
-                    <div class="viz-card-content">
-                        <p>Distribution of Category {{ cat_num }} values specific to the Telco industry.</p>
-                    </div>
-                </div>
-                {% endfor %}
-            </div>
-            
-            <div class="insight-box">
-                <h3>Telco Industry Insights</h3>
-                <p>In the Telco industry, the dominant Problem-Solution (Category 1) is "{{ insights.industry_insights['Telco'].cat1_top }}", utilizing "{{ insights.industry_insights['Telco'].cat2_top }}" technology (Category 2). This industry primarily focuses on the "{{ insights.industry_insights['Telco'].cat3_top }}" stage of the customer journey (Category 3), with "{{ insights.industry_insights['Telco'].cat4_top }}" as the primary data modality (Category 4).</p>
-            </div>
-            {% endif %}
-            
-            {% for industry, charts in per_industry_spider_charts.items() %}
-            {% if industry != 'Telco' %}
+            {% for industry in industry_order %}
             <h3>{{ industry }}</h3>
-            <div class="viz-container">
-                {% for cat_num in range(1, 5) %}
-                <div class="viz-card">
-                    <img src="data:image/png;base64,{{ charts['cat_' + cat_num|string] }}" alt="Spider Chart for {{ industry }} - Category {{ cat_num }}">
-                    <div class="viz-card-content">
-                        <p>Distribution of Category {{ cat_num }} values specific to the {{ industry }} industry.</p>
-                    </div>
-                </div>
-                {% endfor %}
-            </div>
+            {% call chart_block('industry:' + industry, industry + ' spider charts') %}{{ industry_charts(industry) }}{% endcall %}
             
+            {% if industry in insights.industry_insights %}
             <div class="insight-box">
                 <h3>{{ industry }} Industry Insights</h3>
                 <p>In the {{ industry }} industry, the dominant Problem-Solution (Category 1) is "{{ insights.industry_insights[industry].cat1_top }}", utilizing "{{ insights.industry_insights[industry].cat2_top }}" technology (Category 2). This industry primarily focuses on the "{{ insights.industry_insights[industry].cat3_top }}" stage of the customer journey (Category 3), with "{{ insights.industry_insights[industry].cat4_top }}" as the primary data modality (Category 4).</p>
             </div>
             {% endif %}
+            
+            {% if industry in insights.industry_peers %}
+            <h4>Peer Companies in {{ industry }}</h4>
+            <p>Companies with the most similar GenAI use-case profiles (Jaccard similarity of their categories, contact party and contact type).{% if insights.industry_peer_companies[industry] > insights.industry_peers[industry]|length %} Showing the {{ insights.industry_peers[industry]|length }} of {{ insights.industry_peer_companies[industry] }} companies with the closest peers.{% endif %}</p>
+            <table>
+                <tr>
+                    <th>Company</th>
+                    <th>Most Similar Companies</th>
+                </tr>
+                {% for entry in insights.industry_peers[industry] %}
+                <tr>
+                    <td>{{ entry.company }}</td>
+                    <td>{% for peer in entry.peers %}{{ peer.company }} ({{ peer.industry }}, {{ peer.similarity }}%){% if not loop.last %}; {% endif %}{% endfor %}</td>
+                </tr>
+                {% endfor %}
+            </table>
+            {% endif %}
             {% endfor %}
         </section>
         
@@ -509,34 +607,30 @@ html_template = """
             <p>These heatmaps show the correlations between different categories, helping to identify patterns across the dataset.</p>
             
             <h3>All Industries</h3>
-            <div class="viz-container">
-                {% for key, img in heatmaps.items() %}
-                {% if not key.startswith('telco_') %}
-                <div class="viz-card">
-                    <img src="data:image/png;base64,{{ img }}" alt="Heatmap for {{ key }}">
-                    <div class="viz-card-content">
-                        {% set cats = key.split('_') %}
-                        <p>Correlation between {{ cats[0]|replace('cat', 'Category ') }} and {{ cats[1]|replace('cat', 'Category ') }} across all industries.</p>
-                    </div>
-                </div>
-                {% endif %}
-                {% endfor %}
-            </div>
+            {% call chart_block('heatmaps', 'Heatmaps across all industries') %}{{ heatmap_charts() }}{% endcall %}
             
-            <h3>Telco Industry</h3>
-            <div class="viz-container">
-                {% for key, img in heatmaps.items() %}
-                {% if key.startswith('telco_') %}
-                <div class="viz-card">
-                    <img src="data:image/png;base64,{{ img }}" alt="Heatmap for {{ key }}">
-                    <div class="viz-card-content">
-                        {% set cats = key.replace('telco_', '').split('_') %}
-                        <p>Correlation between {{ cats[0]|replace('cat', 'Category ') }} and {{ cats[1]|replace('cat', 'Category ') }} in the Telco industry.</p>
-                    </div>
-                </div>
-                {% endif %}
+            <h3>{{ focus_industry }} Industry</h3>
+            {% call chart_block('focus_heatmaps', focus_industry + ' heatmaps') %}{{ focus_heatmap_charts() }}{% endcall %}
+            
+            <h3>Common Use-Case Patterns</h3>
+            <p>Combinations of Problem-Solution, AI Technology, Customer Journey and Data Modality values shared by the most companies; heatmaps only compare two categories at a time.</p>
+            {% for group in [insights.all_industries, focus_industry] if group in insights.combination_insights %}
+            <h4>{{ group }}</h4>
+            <table>
+                <tr>
+                    <th>Pattern</th>
+                    <th>Companies</th>
+                    <th>Share of Companies</th>
+                </tr>
+                {% for pattern in insights.combination_insights[group] %}
+                <tr>
+                    <td>{{ pattern.labels|join(' + ') }}</td>
+                    <td>{{ pattern.companies }}</td>
+                    <td>{{ pattern.share }}%</td>
+                </tr>
                 {% endfor %}
-            </div>
+            </table>
+            {% endfor %}
             
             <div class="insight-box">
                 <h3>Correlation Insights</h3>
@@ -549,73 +643,215 @@ html_template = """
         
         <section>
             <h2 class="section-title">Conclusions and Recommendations</h2>
-            <p>Based on the analysis of GenAI tools in customer service across different industries, with a special focus on the Telco industry, several key patterns and opportunities emerge:</p>
+            {{ count_note }}
+            <p>Based on the analysis of GenAI tools in customer service across different industries, with a special focus on the {{ focus_industry }} industry, several key patterns and opportunities emerge:</p>
             
             <div class="insight-box">
-                <h3>Key Findings for Telco Industry</h3>
+                <h3>Key Findings for {{ focus_industry }} Industry</h3>
                 <ol>
-                    <li><strong>Telco's Distinctive Use Cases:</strong> Within the telecommunications industry, "{{ insights.telco_cat1_top }}" is the predominant business challenge being addressed by GenAI, compared to "{{ insights.non_telco_cat1_top }}" in other industries.</li>
+                    <li><strong>{{ focus_industry }}'s Distinctive Use Cases:</strong> Within the {{ focus_industry }} industry, "{{ insights.focus_cat1_top }}" is the predominant business challenge being addressed by GenAI, compared to "{{ insights.non_focus_cat1_top }}" in other industries.</li>
                     
-                    <li><strong>Technology Adoption in Telco:</strong> "{{ insights.telco_cat2_top }}" shows the highest adoption rate in the Telco sector, indicating its particular effectiveness for telecommunications customer service challenges.</li>
+                    <li><strong>Technology Adoption in {{ focus_industry }}:</strong> "{{ insights.focus_cat2_top }}" shows the highest adoption rate in the {{ focus_industry }} sector, indicating its particular effectiveness for {{ focus_industry }} customer service challenges.</li>
                     
-                    <li><strong>Customer Journey Focus in Telco:</strong> Telco GenAI applications mainly target the "{{ insights.telco_cat3_top }}" stage, which differs from the "{{ insights.non_telco_cat3_top }}" focus in other industries, reflecting the unique customer interaction patterns in telecommunications.</li>
+                    <li><strong>Customer Journey Focus in {{ focus_industry }}:</strong> {{ focus_industry }} GenAI applications mainly target the "{{ insights.focus_cat3_top }}" stage, which differs from the "{{ insights.non_focus_cat3_top }}" focus in other industries, reflecting the unique customer interaction patterns in {{ focus_industry }}.</li>
                     
-                    <li><strong>Data Modality in Telco:</strong> "{{ insights.telco_cat4_top }}" is the primary modality used in Telco GenAI applications, compared to "{{ insights.non_telco_cat4_top }}" elsewhere, highlighting the specific data types that telecommunication customer service relies on.</li>
+                    <li><strong>Data Modality in {{ focus_industry }}:</strong> "{{ insights.focus_cat4_top }}" is the primary modality used in {{ focus_industry }} GenAI applications, compared to "{{ insights.non_focus_cat4_top }}" elsewhere, highlighting the specific data types that {{ focus_industry }} customer service relies on.</li>
                     
                     {% for cat_num in range(1, 5) %}
-                    {% if insights['telco_distinctive_cat' + cat_num|string] != "None" and insights['telco_distinctive_cat' + cat_num|string + '_diff'] > 0 %}
-                    <li><strong>Distinctive Category {{ cat_num }} Feature:</strong> "{{ insights['telco_distinctive_cat' + cat_num|string] }}" is {{ insights['telco_distinctive_cat' + cat_num|string + '_diff'] }}% more prevalent in Telco than in other industries, representing a unique characteristic of AI applications in telecommunications.</li>
+                    {% if insights['focus_distinctive_cat' + cat_num|string] != "None" and insights['focus_distinctive_cat' + cat_num|string + '_diff'] > 0 %}
+                    <li><strong>Distinctive Category {{ cat_num }} Feature:</strong> "{{ insights['focus_distinctive_cat' + cat_num|string] }}" is {{ insights['focus_distinctive_cat' + cat_num|string + '_diff'] }}% more prevalent in {{ focus_industry }} than in other industries, representing a unique characteristic of AI applications in {{ focus_industry }}.</li>
                     {% endif %}
                     {% endfor %}
                 </ol>
                 
-                <h3>Comparison Between Telco and Other Industries</h3>
-                <p>When comparing telecommunications to other sectors, we observe several important distinctions in how GenAI is deployed for customer service:</p>
+                <h3>Comparison Between {{ focus_industry }} and Other Industries</h3>
+                <p>When comparing {{ focus_industry }} to other sectors, we observe several important distinctions in how GenAI is deployed for customer service:</p>
                 <ul>
-                    <li>Telco's ratio of "{{ insights.telco_cat1_top }}" use cases is {% if insights.telco_cat1_top == insights.non_telco_cat1_top %}similar to{% elif insights.telco_cat1_top_percent > insights.non_telco_cat1_top_percent %}higher than{% else %}lower than{% endif %} other industries ({{ insights.telco_cat1_top_percent }}% vs. {{ insights.non_telco_cat1_top_percent }}%).</li>
+                    <li>{{ focus_industry }}'s ratio of "{{ insights.focus_cat1_top }}" use cases is {% if insights.focus_cat1_top == insights.non_focus_cat1_top %}similar to{% elif insights.focus_cat1_top_percent > insights.non_focus_cat1_top_percent %}higher than{% else %}lower than{% endif %} other industries ({{ insights.focus_cat1_top_percent }}% vs. {{ insights.non_focus_cat1_top_percent }}%).</li>
                     
-                    <li>For AI technology, Telco's preference for "{{ insights.telco_cat2_top }}" is {% if insights.telco_cat2_top == insights.non_telco_cat2_top %}aligned with{% elif insights.telco_cat2_top_percent > insights.non_telco_cat2_top_percent %}stronger than{% else %}weaker than{% endif %} other sectors ({{ insights.telco_cat2_top_percent }}% vs. {{ insights.non_telco_cat2_top_percent }}%).</li>
+                    <li>For AI technology, {{ focus_industry }}'s preference for "{{ insights.focus_cat2_top }}" is {% if insights.focus_cat2_top == insights.non_focus_cat2_top %}aligned with{% elif insights.focus_cat2_top_percent > insights.non_focus_cat2_top_percent %}stronger than{% else %}weaker than{% endif %} other sectors ({{ insights.focus_cat2_top_percent }}% vs. {{ insights.non_focus_cat2_top_percent }}%).</li>
                     
-                    <li>In the customer journey, Telco's focus on "{{ insights.telco_cat3_top }}" stages is {% if insights.telco_cat3_top == insights.non_telco_cat3_top %}consistent with{% elif insights.telco_cat3_top_percent > insights.non_telco_cat3_top_percent %}more intense than{% else %}less pronounced than{% endif %} other industries ({{ insights.telco_cat3_top_percent }}% vs. {{ insights.non_telco_cat3_top_percent }}%).</li>
+                    <li>In the customer journey, {{ focus_industry }}'s focus on "{{ insights.focus_cat3_top }}" stages is {% if insights.focus_cat3_top == insights.non_focus_cat3_top %}consistent with{% elif insights.focus_cat3_top_percent > insights.non_focus_cat3_top_percent %}more intense than{% else %}less pronounced than{% endif %} other industries ({{ insights.focus_cat3_top_percent }}% vs. {{ insights.non_focus_cat3_top_percent }}%).</li>
                     
-                    <li>For data modalities, Telco's use of "{{ insights.telco_cat4_top }}" is {% if insights.telco_cat4_top == insights.non_telco_cat4_top %}comparable to{% elif insights.telco_cat4_top_percent > insights.non_telco_cat4_top_percent %}higher than{% else %}lower than{% endif %} other sectors ({{ insights.telco_cat4_top_percent }}% vs. {{ insights.non_telco_cat4_top_percent }}%).</li>
+                    <li>For data modalities, {{ focus_industry }}'s use of "{{ insights.focus_cat4_top }}" is {% if insights.focus_cat4_top == insights.non_focus_cat4_top %}comparable to{% elif insights.focus_cat4_top_percent > insights.non_focus_cat4_top_percent %}higher than{% else %}lower than{% endif %} other sectors ({{ insights.focus_cat4_top_percent }}% vs. {{ insights.non_focus_cat4_top_percent }}%).</li>
                 </ul>
                 
-                <h3>Recommendations for Telco Customer Service</h3>
+                <h3>Recommendations for {{ focus_industry }} Customer Service</h3>
                 <ol>
-                    <li><strong>Prioritize AI Solutions:</strong> Focus on implementing AI technologies for "{{ insights.telco_cat1_top }}" and "Customer Support & Query Resolution" as these represent the highest-value opportunities in telecommunications.</li>
+                    <li><strong>Prioritize AI Solutions:</strong> Focus on implementing AI technologies for "{{ insights.focus_cat1_top }}" and "Customer Support & Query Resolution" as these represent the highest-value opportunities in {{ focus_industry }}.</li>
                     
-                    <li><strong>Technology Investment:</strong> Continue investing in "{{ insights.telco_cat2_top }}" capabilities while exploring complementary technologies that can enhance customer service operations.</li>
+                    <li><strong>Technology Investment:</strong> Continue investing in "{{ insights.focus_cat2_top }}" capabilities while exploring complementary technologies that can enhance customer service operations.</li>
                     
-                    <li><strong>Customer Journey Enhancement:</strong> Strengthen AI applications in the "{{ insights.telco_cat3_top }}" stage, which is crucial for telecommunications customer experiences.</li>
+                    <li><strong>Customer Journey Enhancement:</strong> Strengthen AI applications in the "{{ insights.focus_cat3_top }}" stage, which is crucial for {{ focus_industry }} customer experiences.</li>
                     
-                    <li><strong>Multimodal Capabilities:</strong> While "{{ insights.telco_cat4_top }}" remains dominant, consider expanding AI capabilities to handle multiple data types simultaneously, especially for complex customer interactions.</li>
+                    <li><strong>Multimodal Capabilities:</strong> While "{{ insights.focus_cat4_top }}" remains dominant, consider expanding AI capabilities to handle multiple data types simultaneously, especially for complex customer interactions.</li>
                     
-                    <li><strong>Industry Benchmarking:</strong> Look to other industries with advanced GenAI implementations, particularly in areas where Telco may be lagging, to identify transferable best practices.</li>
+                    <li><strong>Industry Benchmarking:</strong> Look to other industries with advanced GenAI implementations, particularly in areas where {{ focus_industry }} may be lagging, to identify transferable best practices.</li>
                 </ol>
             </div>
         </section>
+        {% endif %}
         
         <div class="footer">
-            <p>GenAI in Customer Service Analysis | Created for Telco Industry Research</p>
+            <p>GenAI in Customer Service Analysis | Created for {{ focus_industry }} Industry Research</p>
         </div>
     </div>
+    {% if page == 'index' %}
+    <script>
+        // Fetch a chart page the first time its section is opened and show its charts in place;
+        // where fetching is not possible (e.g. opened from disk) the link to the page stays
+        document.querySelectorAll('details.lazy-fragment').forEach((details) => {
+            details.addEventListener('toggle', () => {
+                if (!details.open || details.dataset.loaded) {
+                    return;
+                }
+                details.dataset.loaded = 'true';
+                fetch(details.dataset.src)
+                    .then((response) => {
+                        if (!response.ok) {
+                            throw new Error(response.statusText);
+                        }
+                        return response.text();
+                    })
+                    .then((html) => {
+                        const page = new DOMParser().parseFromString(html, 'text/html');
+                        page.querySelectorAll('.chart-images').forEach((style) => document.head.appendChild(style));
+                        details.querySelector('.fragment-body').replaceChildren(...page.querySelector('main.fragment').childNodes);
+                    })
+                    .catch(() => {
+                        delete details.dataset.loaded;
+                    });
+            });
+        });
+    </script>
+    {% endif %}
 </body>
 </html>
 """
 
-# Render the template
-template = Template(html_template)
-html_output = template.render(
-    basic_stats=basic_stats,
-    all_industry_spider_charts=all_industry_spider_charts,
-    per_industry_spider_charts=per_industry_spider_charts,
-    heatmaps=heatmaps,
-    insights=insights
-)
+# Compile the report template
+def create_template():
+    return Environment().from_string(html_template)
+
+# Charts on each page of a paged report, the index itself has none
+def report_pages(focus_report, per_industry_spider_charts, heatmaps, industry_order):
+    """Return {page: charts} for the index and the chart fragment pages of one report"""
+    spider_charts = focus_report['spider_charts']
+    pages = {
+        'index': {},
+        'overall': {key: ref for key, ref in spider_charts.items() if key.startswith('all_industries_')},
+        'comparison': {key: ref for key, ref in spider_charts.items() if key.startswith('focus_vs_others_')}
+    }
+    for industry in industry_order:
+        pages[f'industry:{industry}'] = per_industry_spider_charts[industry]
+    pages['heatmaps'] = heatmaps
+    pages['focus_heatmaps'] = focus_report['heatmaps']
+    return pages
+
+# File name of a page within a paged report's directory
+def page_filename(page):
+    if page.startswith('industry:'):
+        return f"industry_{industry_key(page[len('industry:'):])}.html"
+    return f'{page}.html'
+
+# Stream one page of a report to disk, so only one inlined image is in memory at a time
+def write_page(template, filename, charts, bundle=None, **context):
+    """Write a page with its charts inlined, or into the bundle with its charts as linked assets"""
+    # Hash every chart up front so that the stylesheet can define each distinct image once
+    images = ReportImages()
+    for page_charts in charts:
+        images.register(page_charts)
+    if bundle is None:
+        with open(filename, 'w', encoding='utf-8') as f:
+            template.stream(images=images, chart_stylesheet=None, **context).dump(f)
+        return
+    
+    # Charts and their stylesheet are content-hashed assets, relative to the stylesheet they are linked from
+    stylesheet = '\n'.join(images.css_rules(
+        lambda ref: bundle.url(bundle.add_file(artifact_path(ref)), posixpath.join(ASSET_DIR, 'charts.css'))))
+    stylesheet_path = bundle.add_asset(stylesheet.encode('utf-8'), 'charts.css')
+    html = template.render(images=images, chart_stylesheet=bundle.url(stylesheet_path, filename), **context)
+    bundle.add_entry(filename, html.encode('utf-8'))
+
+# Render one focus industry's report as a single page, or as an index page with chart pages fetched on demand
+def render_report(template, focus_report, per_industry_spider_charts, heatmaps, shared_insights, paged=False,
+                  bundle=None):
+    """Write the HTML report for one focus industry and return the file name of its (index) page
 
-# Write the HTML to file
-with open('gen_ai_customer_service_analysis.html', 'w', encoding='utf-8') as f:
-    f.write(html_output)
+    With a bundle the pages are added to it (file names relative to the bundle) instead of written in place.
+    """
+    focus_industry = focus_report['focus_industry']
+    insights = dict(shared_insights, **focus_report['insights'])
+    
+    # Focus industry first, then the others in order of appearance
+    industry_order = [focus_industry] + [industry for industry in per_industry_spider_charts if industry != focus_industry]
+    industry_order = [industry for industry in industry_order if industry in per_industry_spider_charts]
+    
+    context = dict(
+        focus_industry=focus_industry,
+        basic_stats=focus_report['basic_stats'],
+        all_industry_spider_charts=focus_report['spider_charts'],
+        per_industry_spider_charts=per_industry_spider_charts,
+        industry_order=industry_order,
+        heatmaps=heatmaps,
+        focus_heatmaps=focus_report['heatmaps'],
+        insights=insights
+    )
+    
+    # Write the HTML to file
+    filename = report_filename(focus_industry)
+    if not paged:
+        charts = (per_industry_spider_charts, focus_report['spider_charts'], heatmaps, focus_report['heatmaps'])
+        write_page(template, filename, charts, bundle, page=None, **context)
+        return filename
+    
+    # Paged: the index holds statistics and insights, every chart grid is a page of its own
+    directory = os.path.splitext(filename)[0]
+    if bundle is None:
+        os.makedirs(directory, exist_ok=True)
+    pages = report_pages(focus_report, per_industry_spider_charts, heatmaps, industry_order)
+    page_files = {page: page_filename(page) for page in pages}
+    for page, charts in pages.items():
+        page_industry = page[len('industry:'):] if page.startswith('industry:') else None
+        write_page(template, os.path.join(directory, page_files[page]), [charts], bundle, page=page,
+                   page_industry=page_industry, page_files=page_files, **context)
+    return os.path.join(directory, page_files['index'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Render the GenAI customer service HTML reports')
+    parser.add_argument('--paged', action='store_true',
+                        help='write each report as an index page plus chart pages loaded when opened')
+    parser.add_argument('--bundle', nargs='?', const=BUNDLE_DIR, metavar='DIR',
+                        help=f'write the reports as a static bundle with content-hashed, precompressed assets and a manifest (default: {BUNDLE_DIR})')
+    args = parser.parse_args()
+    
+    # Load the visualization data (charts are artifact references, inlined while rendering)
+    cube = np.load('gen_ai_cs_viz/cube.npy', allow_pickle=True).item()
+    per_industry_spider_charts = np.load('gen_ai_cs_viz/per_industry_spider_charts.npy', allow_pickle=True).item()
+    heatmaps = np.load('gen_ai_cs_viz/heatmaps.npy', allow_pickle=True).item()
+    focus_reports = np.load('gen_ai_cs_viz/focus_reports.npy', allow_pickle=True).item()
+    
+    # Distinct companies per category pair, for the correlation insights
+    pair_tables = np.load('gen_ai_cs_viz/pair_tables.npy', allow_pickle=True).item()
+    
+    # Most similar companies of every company, for the peer lists
+    peers = pd.DataFrame(np.load('gen_ai_cs_viz/peers.npy', allow_pickle=True).item())
+    
+    # Frequent combinations of category values, for the use-case patterns
+    combinations = pd.DataFrame(np.load('gen_ai_cs_viz/combinations.npy', allow_pickle=True).item())
+    
+    # Generate insights once for all reports
+    shared_insights = generate_insights(pair_tables, cube, peers, combinations)
+    
+    template = create_template()
+    
+    bundle = StaticBundle(args.bundle) if args.bundle else None
+    for focus_report in focus_reports.values():
+        filename = render_report(template, focus_report, per_industry_spider_charts, heatmaps, shared_insights,
+                                 paged=args.paged, bundle=bundle)
+        print(f"HTML report generated successfully: {filename}")
+    if bundle is not None:
+        print(f"Static bundle written to {args.bundle}, see {bundle.finish()}")
 
-print("HTML report generated successfully: gen_ai_customer_service_analysis.html")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import base64
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+
+# Output format for all charts: 'png' or 'webp'
+IMAGE_FORMAT = 'png'
+
+# zlib compression level used for PNG output (0 = fastest, 9 = smallest)
+PNG_COMPRESS_LEVEL = 6
+
+# Number of palette colours charts are quantized to, None keeps full RGBA pixels
+# (spider charts only use the five palette colours plus their anti-aliased blends;
+# charts drawn with a continuous colormap, like the heatmaps, are submitted unquantized)
+PALETTE_COLORS = 64
+
+# Resolution the charts are rasterized at
+IMAGE_DPI = 300
+
+# White border kept around the drawn content, like savefig's pad_inches=0.1
+IMAGE_PAD_INCHES = 0.1
+
+# Maximum number of rasterized charts waiting to be encoded; each one holds a full
+# RGBA buffer (~75 MB at 300 dpi), so this bounds the peak memory whatever the core count
+MAX_PENDING_ENCODES = 4
+
+# Number of threads encoding images in the background, more could never all be busy
+ENCODE_WORKERS = min(os.cpu_count() or 1, MAX_PENDING_ENCODES)
+
+# Directory acting as the artifact store, charts are referenced by file name within it
+ARTIFACT_DIR = 'gen_ai_cs_viz'
+
+IMAGE_MIME_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml'
+}
+
+# Agg canvas keeping the pixels it prints instead of writing them to a file
+class _PixelCanvas(FigureCanvasAgg):
+    def print_rgba(self, filename_or_obj, **kwargs):
+        FigureCanvasAgg.draw(self)
+        # The raw buffer carries no header, its exact size is the one of the canvas that drew it
+        width, height = self.get_width_height(physical=True)
+        self.pixels = np.array(self.buffer_rgba()).reshape(height, width, 4)
+
+# Rasterize a matplotlib figure into RGBA pixels using the Agg renderer
+def figure_to_rgba(fig, dpi=IMAGE_DPI):
+    """Draw the figure once, cropped like bbox_inches='tight', and return its RGBA pixels"""
+    fig.set_dpi(dpi)
+    bbox = fig.get_tightbbox().padded(IMAGE_PAD_INCHES)
+
+    canvas = _PixelCanvas(fig)
+    fig.savefig(None, format='rgba', dpi=dpi, bbox_inches=bbox)
+    return canvas.pixels
+
+# Encode RGBA pixels into PNG or WebP bytes
+def encode_rgba(rgba, image_format=IMAGE_FORMAT, compress_level=PNG_COMPRESS_LEVEL,
+                palette_colors=PALETTE_COLORS):
+    """Encode an RGBA array with optional palette quantization"""
+    image = Image.fromarray(rgba, 'RGBA')
+
+    # Charts are drawn on an opaque background, so the alpha channel carries no information
+    if rgba[:, :, 3].min() == 255:
+        image = image.convert('RGB')
+
+    buf = BytesIO()
+    if image_format == 'webp':
+        image.save(buf, format='WEBP', lossless=True, method=4)
+    else:
+        if palette_colors:
+            image = image.quantize(colors=palette_colors, method=Image.Quantize.FASTOCTREE)
+        image.save(buf, format='PNG', compress_level=compress_level)
+    return buf.getvalue()
+
+# Encode rendered figures in a thread pool while the main thread keeps drawing
+class ImageEncoder:
+    """Thread pool that turns rasterized figures into image files in the artifact store"""
+
+    def __init__(self, image_format=IMAGE_FORMAT, compress_level=PNG_COMPRESS_LEVEL,
+                 palette_colors=PALETTE_COLORS, workers=ENCODE_WORKERS,
+                 max_pending=MAX_PENDING_ENCODES):
+        self.image_format = image_format
+        self.compress_level = compress_level
+        self.palette_colors = palette_colors
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+
+    def submit(self, fig, name, quantize=True):
+        """Rasterize and close the figure, then encode and write it in the background
+
+        Returns the artifact reference (file name) the image will be stored under.
+        Blocks while too many rasterized charts are still waiting to be encoded.
+        Without quantize the image keeps its full colours, e.g. for continuous colormaps.
+        """
+        ref = f'{name}.{self.image_format}'
+        self.pending.acquire()
+        try:
+            rgba = figure_to_rgba(fig)
+        except BaseException:
+            self.pending.release()
+            raise
+        finally:
+            plt.close(fig)
+        palette_colors = self.palette_colors if quantize else None
+        future = self.executor.submit(self._encode, rgba, artifact_path(ref), palette_colors)
+        future.add_done_callback(lambda _: self.pending.release())
+        self.futures.append(future)
+        return ref
+
+    def _encode(self, rgba, path, palette_colors):
+        data = encode_rgba(rgba, self.image_format, self.compress_level, palette_colors)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def wait(self):
+        """Wait for all queued encodes to finish, raising the first encoding error"""
+        for future in self.futures:
+            future.result()
+        self.futures = []
+
+# Resolve an artifact reference to its path in the artifact store
+def artifact_path(ref):
+    return os.path.join(ARTIFACT_DIR, ref)
+
+# Read a stored chart as a data URI for embedding in HTML
+def image_data_uri(ref):
+    """Load the referenced image and return it as a base64 data URI"""
+    image_format = os.path.splitext(ref)[1].lstrip('.')
+    with open(artifact_path(ref), 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode('utf-8')
+    return f'data:{IMAGE_MIME_TYPES[image_format]};base64,{encoded}'
+
+# All artifact references in a (nested) dict of charts
+def chart_refs(charts):
+    for value in charts.values():
+        if isinstance(value, dict):
+            yield from chart_refs(value)
+        else:
+            yield value
+
+# Whether every chart of a (nested) dict is present in the artifact store
+def artifacts_exist(charts):
+    return all(os.path.exists(artifact_path(ref)) for ref in chart_refs(charts))
+
+# Content hashes of stored charts, keyed by reference and file signature
+_digest_cache = {}
+
+# Content hash of a stored chart
+def artifact_digest(ref):
+    """Return the SHA-256 of the referenced image, cached until the file changes"""
+    stat = os.stat(artifact_path(ref))
+    key = (ref, stat.st_mtime_ns, stat.st_size)
+    if key not in _digest_cache:
+        digest = hashlib.sha256()
+        with open(artifact_path(ref), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _digest_cache[key] = digest.hexdigest()
+    return _digest_cache[key]
+
+# Pixel (or view box) size of a stored chart
+def image_size(ref):
+    """Return the width and height of a raster image, or of an SVG's view box"""
+    if ref.endswith('.svg'):
+        with open(artifact_path(ref), encoding='utf-8') as f:
+            view_box = re.search(r'viewBox="([^"]+)"', f.read(4096)).group(1)
+        return tuple(float(value) for value in view_box.split()[2:])
+    with Image.open(artifact_path(ref)) as image:
+        return image.size
+
+# Images of one report, deduplicated by content
+class ReportImages:
+    """Assign each distinct image a CSS class so it is embedded only once per report"""
+
+    def __init__(self):
+        self.classes = {}
+        self.definitions = {}
+
+    def register(self, charts):
+        """Register every reference in a (nested) dict of chart references"""
+        for ref in chart_refs(charts):
+            self.css_class(ref)
+
+    def css_class(self, ref):
+        """Return the CSS class displaying the referenced image"""
+        if ref not in self.classes:
+            css_class = f'img-{artifact_digest(ref)[:16]}'
+            self.classes[ref] = css_class
+            self.definitions.setdefault(css_class, ref)
+        return self.classes[ref]
+
+    def css_rules(self, image_url=None):
+        """Yield one rule per distinct image, loading the images one at a time
+
+        Images are inlined as data URIs unless image_url maps a reference to the URL it is served at.
+        """
+        for css_class, ref in self.definitions.items():
+            width, height = image_size(ref)
+            url = image_data_uri(ref) if image_url is None else image_url(ref)
+            yield f'.{css_class} {{ background-image: url({url}); aspect-ratio: {width} / {height}; }}'
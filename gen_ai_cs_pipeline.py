@@ -0,0 +1,253 @@
+import functools
+import hashlib
+import multiprocessing
+import os
+import pickle
+import re
+import sys
+import types
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+# Worker processes running independent stages side by side (pyplot keeps global
+# figure state, so chart stages need separate processes rather than threads)
+STAGE_WORKERS = os.cpu_count() or 1
+
+# Number of processes in the pool the current process works in, 1 outside a pool
+POOL_WORKERS = 1
+
+# Initializer of the worker processes
+def _init_worker(workers):
+    global POOL_WORKERS
+    POOL_WORKERS = workers
+
+# Cores available to the current process
+def process_cores():
+    """Return every core outside a pool, and an equal share of them in a pool worker"""
+    return max(1, (os.cpu_count() or 1) // POOL_WORKERS)
+
+# Completed stage outputs are pickled here so that reruns resume where they stopped
+CHECKPOINT_DIR = os.path.join('gen_ai_cs_viz', 'checkpoints')
+
+# One step of the pipeline
+class Stage:
+    """A function computing named outputs from the named outputs of other stages
+
+    func is called with the input values in order; a stage with several outputs returns
+    them as a tuple. check, if given, tells whether checkpointed outputs are still usable
+    (e.g. the chart files they reference still exist). Local stages always run in the
+    calling process, for cheap steps (e.g. slicing a table) whose inputs would cost more
+    to send to a worker than to process.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=None, check=None, local=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = [name] if outputs is None else list(outputs)
+        self.check = check
+        self.local = local
+
+# Run a stage's function, in a worker process or inline
+def _run_stage(func, args, output_count):
+    result = func(*args)
+    return (result,) if output_count == 1 else tuple(result)
+
+# Content key of a pipeline input
+def value_key(value):
+    """Hash dicts item by item, pandas objects by content and anything else by its pickle
+
+    Values with a content_key attribute (e.g. handles to shared data) are keyed by it.
+    """
+    digest = hashlib.sha256()
+    if getattr(value, 'content_key', None) is not None:
+        digest.update(value.content_key.encode('utf-8'))
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            digest.update(pickle.dumps(key))
+            digest.update(value_key(item).encode('utf-8'))
+    elif isinstance(value, pd.DataFrame) and not (value.dtypes == object).any():
+        digest.update(pickle.dumps(list(value.columns)))
+        digest.update(pd.util.hash_pandas_object(value).values.tobytes())
+    elif isinstance(value, pd.Series) and value.dtype != object:
+        digest.update(pickle.dumps(value.name))
+        digest.update(pd.util.hash_pandas_object(value).values.tobytes())
+    else:
+        # Object columns (e.g. sketches) would be hashed through their repr, so pickle them
+        digest.update(pickle.dumps(value))
+    return digest.hexdigest()
+
+# Source files already hashed, the code rarely changes within a run
+_source_keys = {}
+
+# Content hash of a source file
+def _source_key(path):
+    if path not in _source_keys:
+        with open(path, 'rb') as f:
+            _source_keys[path] = hashlib.sha256(f.read()).hexdigest()
+    return _source_keys[path]
+
+# Project modules a module depends on
+def project_modules(module):
+    """Return the source files of module and of the modules in its directory it imports, directly or not
+
+    Importing a function, class or object from a module counts as importing the module.
+    """
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return []
+    root = os.path.dirname(os.path.abspath(path))
+    found = {}
+    todo = [module]
+    while todo:
+        module = todo.pop()
+        path = getattr(module, '__file__', None)
+        if path is None or module.__name__ in found or os.path.dirname(os.path.abspath(path)) != root:
+            continue
+        found[module.__name__] = path
+        for value in list(vars(module).values()):
+            if isinstance(value, types.ModuleType):
+                todo.append(value)
+            else:
+                name = getattr(value, '__module__', None)
+                if isinstance(name, str) and name in sys.modules:
+                    todo.append(sys.modules[name])
+    return sorted(set(found.values()))
+
+# Key of the code behind a stage function
+def code_key(func):
+    """Hash the project sources func depends on and any arguments bound to it with functools.partial"""
+    digest = hashlib.sha256()
+    while isinstance(func, functools.partial):
+        # Functions among the bound arguments pickle by name, so the key is stable across runs
+        digest.update(pickle.dumps((func.args, sorted(func.keywords.items()))))
+        func = func.func
+
+    for path in project_modules(sys.modules[func.__module__]):
+        digest.update(f'{os.path.basename(path)}:{_source_key(path)}\n'.encode('utf-8'))
+    digest.update(func.__qualname__.encode('utf-8'))
+    return digest.hexdigest()
+
+# Checkpoint key of a stage
+def stage_key(stage, keys):
+    """Combine the stage's code with the keys of its inputs"""
+    parts = [stage.name, code_key(stage.func)] + [keys[name] for name in stage.inputs]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+# Checkpoint file of a stage, readable yet unique even when names differ only in punctuation
+def _checkpoint_path(checkpoint_dir, stage):
+    readable = re.sub(r'[^\w.-]+', '_', stage.name)
+    name_hash = hashlib.sha256(stage.name.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(checkpoint_dir, f'{readable}-{name_hash}.pkl')
+
+# Load a stage's outputs from its checkpoint
+def load_checkpoint(checkpoint_dir, stage, key):
+    """Return the checkpointed outputs if they were computed from the same key, else None
+
+    The key is the file's first record, so the outputs of a stale checkpoint are never
+    unpickled; outputs that no longer unpickle (e.g. of a renamed class) count as stale.
+    """
+    try:
+        with open(_checkpoint_path(checkpoint_dir, stage), 'rb') as f:
+            if pickle.load(f) != key:
+                return None
+            outputs = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    if stage.check is not None and not all(stage.check(value) for value in outputs):
+        return None
+    return outputs
+
+# Store a stage's outputs as its checkpoint
+def save_checkpoint(checkpoint_dir, stage, key, outputs):
+    """Write the checkpoint atomically, replacing the stage's previous one"""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = _checkpoint_path(checkpoint_dir, stage)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(key, f)
+        pickle.dump(outputs, f)
+    os.replace(tmp_path, path)
+
+# Check that every stage input is produced exactly once
+def _validate(stages, values):
+    producers = set(values)
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"'{output}' is produced more than once")
+            producers.add(output)
+    for stage in stages:
+        missing = [name for name in stage.inputs if name not in producers]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' needs unknown inputs: {', '.join(missing)}")
+
+# Execute a DAG of stages
+def run_pipeline(stages, values, workers=STAGE_WORKERS, checkpoint_dir=CHECKPOINT_DIR):
+    """Run every stage once its inputs are available and return all values by name
+
+    values holds the pipeline inputs. Stages whose inputs are ready run concurrently in
+    a pool of worker processes (inline when workers is 1). Each completed stage is
+    checkpointed and reused on later runs while its code and the contents of its inputs
+    are unchanged.
+    """
+    _validate(stages, values)
+    values = dict(values)
+    keys = {name: value_key(value) for name, value in values.items()}
+    pending = list(stages)
+    running = {}
+    error = None
+
+    def finish(stage, outputs):
+        # Outputs are keyed by content, so stages after one that reproduced its outputs are not rerun
+        for position, output in enumerate(stage.outputs):
+            values[output] = outputs[position]
+            keys[output] = value_key(outputs[position])
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(workers,))
+    try:
+        while pending or running:
+            ready = [stage for stage in pending if all(name in values for name in stage.inputs)] if error is None else []
+            for stage in ready:
+                pending.remove(stage)
+                key = stage_key(stage, keys)
+                outputs = load_checkpoint(checkpoint_dir, stage, key)
+                if outputs is not None:
+                    finish(stage, outputs)
+                elif pool is not None and not stage.local:
+                    future = pool.submit(_run_stage, stage.func, [values[name] for name in stage.inputs], len(stage.outputs))
+                    running[future] = stage, key
+                else:
+                    outputs = _run_stage(stage.func, [values[name] for name in stage.inputs], len(stage.outputs))
+                    save_checkpoint(checkpoint_dir, stage, key, outputs)
+                    finish(stage, outputs)
+            if ready:
+                continue
+
+            if not running:
+                if error is not None:
+                    break
+                raise ValueError(f"Dependency cycle between stages: {', '.join(stage.name for stage in pending)}")
+
+            # Keep the stages that do finish, even after another one failed
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, key = running.pop(future)
+                try:
+                    outputs = future.result()
+                except Exception as exc:
+                    error = error or exc
+                    continue
+                save_checkpoint(checkpoint_dir, stage, key, outputs)
+                finish(stage, outputs)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if error is not None:
+        raise error
+    return values
@@ -0,0 +1,265 @@
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# Parquet needs pyarrow; without it the cache falls back to pickle files
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+# Survey workbook and the Tableau-ready table derived from it
+WORKBOOK_PATH = 'originial_data_0331.xlsx'
+DATA_PATH = 'tableau_ready_data.csv'
+
+# Typed Parquet copy of the table, one partition directory per industry
+DATASET_PATH = 'tableau_ready_data.parquet'
+
+# Indexed SQLite copy of the table, queried for distinct counts without loading it
+STORE_PATH = 'tableau_ready_data.sqlite'
+
+# Columns the analysis filters on and counts companies by, each with a distinct-count view in the store
+STORE_COUNT_COLUMNS = ['Contact_Party', 'Contact_Type', 'Cat 1', 'Cat 2', 'Cat 3', 'Cat 4']
+
+# Rename columns to remove special characters and spaces, which makes them easier to use in Tableau
+COLUMN_RENAMES = {
+    'Who contacts the other party (Customer, Company, None)': 'Contact_Party',
+    'External (customer contact) vs. internal (data center, agent support etc) ': 'Contact_Type'
+}
+
+# Multi-select category columns, cells hold ';'-separated codes
+CATEGORY_COLUMNS = ['Cat 1', 'Cat 2', 'Cat 3', 'Cat 4']
+
+# Column order of the preprocessed table, as written to the CSV
+DATA_COLUMNS = ['Industry', 'Company'] + list(COLUMN_RENAMES.values()) + CATEGORY_COLUMNS + \
+               [f'{col} Label' for col in CATEGORY_COLUMNS]
+
+# Position of each row in the CSV, stored in the dataset because partitioning regroups the rows
+ROW_COLUMN = 'Row'
+
+# Placeholders and stray characters removed from the category cells in a single pass
+# ('.0' only appears when a single code was stored as a float)
+CATEGORY_CLEAN_PATTERN = r"[`\- ]|None|nan|\.0$"
+
+# Preprocessed tables are cached here, keyed by the workbook's content hash
+CACHE_DIR = '.gen_ai_cs_cache'
+
+# Clear labels for every category code
+CATEGORY_LABELS = {
+    'Cat 1': {
+        '1': 'Summarization & Insights',
+        '2': 'Personalization & Engagement',
+        '3': 'Content Creation & Enhancement',
+        '4': 'Customer Support & Query Resolution',
+        '5': 'Process Automation',
+        '6': 'Predictive Analytics & Sentiment Analysis'
+    },
+    'Cat 2': {
+        '1': 'Conversational AI',
+        '2': 'Multi-Agent System',
+        '3': 'Multimodal AI',
+        '4': 'Process Automation (RPA)',
+        '5': 'Marketing & Personalized AI',
+        '6': 'Predictive Analysis',
+        '7': 'Sentiment Analysis & Customer Insights'
+    },
+    'Cat 3': {
+        '1': 'Awareness & Brand Discovery',
+        '2': 'Consideration & Purchase Decision-Making',
+        '3': 'Service Usage & Ongoing Support',
+        '4': 'Customer Retention & Loyalty',
+        '5': 'Exit & Feedback Optimization'
+    },
+    'Cat 4': {
+        '1': 'Text-to-Text AI',
+        '2': 'Text-to-Image AI',
+        '3': 'Text-to-Voice AI',
+        '4': 'Voice-to-Text AI',
+        '5': 'Voice-to-Audio AI'
+    }
+}
+
+# Load the raw survey workbook
+def read_workbook(path=WORKBOOK_PATH):
+    """Stream the first sheet in read-only mode, keeping literal 'None' answers (e.g. Contact_Party) as text"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows)
+        raw_df = pd.DataFrame(rows, columns=header)
+    finally:
+        workbook.close()
+
+    # Read-only sheets may report unused trailing columns, and empty cells count as missing
+    raw_df = raw_df.loc[:, [name is not None for name in raw_df.columns]]
+    return raw_df.mask(raw_df == '')
+
+# Clean a multi-select category column
+def clean_category_cells(values):
+    """Return the cells as ';'-separated code strings, missing cells as ''"""
+    return values.astype('string').str.replace(CATEGORY_CLEAN_PATTERN, '', regex=True).fillna('')
+
+# Turn the raw survey into one row per combination of category codes
+def preprocess(raw_df):
+    """Clean the category cells, expand multi-select answers and attach the category labels"""
+    df = raw_df.rename(columns=COLUMN_RENAMES)
+
+    # Rows without a company are blank lines in the workbook
+    df = df.dropna(subset=['Industry', 'Company'])
+
+    # Data cleaning (remove special characters and spaces) and splitting of the multi-select answers
+    df_expanded = df.copy()
+    for col in CATEGORY_COLUMNS:
+        df_expanded[col] = clean_category_cells(df[col]).str.split(';')
+
+    # Expand multi-select category answers into multiple rows
+    for col in CATEGORY_COLUMNS:
+        df_expanded = df_expanded.explode(col)
+
+    # Remove rows with missing categories
+    df_expanded = df_expanded[
+        (df_expanded['Cat 1'] != '') &
+        (df_expanded['Cat 2'] != '') &
+        (df_expanded['Cat 3'] != '') &
+        (df_expanded['Cat 4'] != '')
+    ]
+
+    # Map category labels
+    for col in CATEGORY_COLUMNS:
+        df_expanded[f'{col} Label'] = df_expanded[col].map(CATEGORY_LABELS[col])
+
+    return df_expanded
+
+# Cache key of a workbook
+def workbook_digest(path=WORKBOOK_PATH):
+    """Hash the workbook contents together with the preprocessing rules applied to them"""
+    digest = hashlib.sha256(repr((COLUMN_RENAMES, CATEGORY_CLEAN_PATTERN, CATEGORY_LABELS)).encode('utf-8'))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Preprocessed table of a workbook, parsed only once per workbook version
+def load_preprocessed(path=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Return the preprocessed workbook from the cache, parsing and caching it on a miss"""
+    cache_path = os.path.join(cache_dir, f'{workbook_digest(path)}.{CACHE_FORMAT}')
+    if os.path.exists(cache_path):
+        if CACHE_FORMAT == 'parquet':
+            return pd.read_parquet(cache_path)
+        return pd.read_pickle(cache_path)
+
+    df_expanded = preprocess(read_workbook(path))
+
+    # Write under a temporary name so a concurrent reader never sees a partial file
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    if CACHE_FORMAT == 'parquet':
+        df_expanded.to_parquet(tmp_path)
+    else:
+        df_expanded.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+    return df_expanded
+
+# Give a freshly preprocessed table the types the analysis scripts work with
+def as_csv_types(df_expanded):
+    """Return the table as pd.read_csv would read it back from the CSV (integer codes, 'None' as missing)"""
+    buf = io.StringIO()
+    df_expanded.to_csv(buf, index=False)
+    buf.seek(0)
+    return pd.read_csv(buf)
+
+# Write the typed, partitioned Parquet dataset
+def write_dataset(df, path=DATASET_PATH):
+    """Store codes as int8 and text as dictionary-encoded strings, partitioned by Industry
+
+    df is the table as read back from the CSV, so that both sources load identically
+    (pd.read_csv reads placeholders such as 'None' as missing).
+    """
+    dataset = df[DATA_COLUMNS].reset_index(drop=True)
+    for col in DATA_COLUMNS:
+        if col in CATEGORY_COLUMNS:
+            dataset[col] = dataset[col].astype('int8')
+        else:
+            dataset[col] = dataset[col].astype('category')
+    dataset[ROW_COLUMN] = dataset.index.astype('int32')
+
+    # Parquet datasets are appended to, so write a fresh directory and swap it in
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    dataset.to_parquet(tmp_path, partition_cols=['Industry'], compression='zstd', index=False)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+# Load the preprocessed table for analysis
+def load_data(columns=None, industries=None, path=DATASET_PATH, csv_path=DATA_PATH):
+    """Read the selected columns of the selected industries, typed like pd.read_csv(csv_path)
+
+    Only the requested columns and industry partitions are read from the Parquet dataset.
+    Falls back to the CSV when the dataset is missing or older than the CSV (e.g. edited by hand).
+    """
+    columns = DATA_COLUMNS if columns is None else list(columns)
+    if not os.path.isdir(path) or os.path.getmtime(path) < os.path.getmtime(csv_path):
+        df = pd.read_csv(csv_path, usecols=lambda col: col in columns or col == 'Industry')
+        if industries is not None:
+            df = df[df['Industry'].isin(industries)].reset_index(drop=True)
+        return df[columns]
+
+    filters = [('Industry', 'in', list(industries))] if industries is not None else None
+    df = pd.read_parquet(path, columns=columns + [ROW_COLUMN], filters=filters)
+
+    # Back to the original row order and the plain types the scripts work with
+    df = df.sort_values(ROW_COLUMN).drop(columns=ROW_COLUMN).reset_index(drop=True)
+    for col in columns:
+        if col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype('int64')
+        else:
+            df[col] = df[col].astype(str)
+    return df[columns]
+
+# Name of the store view counting the companies per industry and value of a column
+def store_view(col):
+    return col.lower().replace(' ', '_') + '_companies'
+
+# Write the table to the embedded SQLite store
+def write_store(df, path=STORE_PATH):
+    """Store the rows in table 'data' (rowid = CSV row + 1) with indexes and distinct-count views
+
+    Every count column gets an index on (column, Industry, Company), which serves filters
+    on the column and covers its view, so counts never read the table itself. The view
+    industry_companies counts the companies per industry, store_view(col) per industry and value.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with sqlite3.connect(tmp_path) as conn:
+        df[DATA_COLUMNS].to_sql('data', conn, index=False)
+        conn.execute('CREATE INDEX idx_industry ON data (Industry, Company)')
+        conn.execute('CREATE INDEX idx_company ON data (Company)')
+        conn.execute('CREATE VIEW industry_companies AS '
+                     'SELECT Industry, COUNT(DISTINCT Company) AS companies FROM data GROUP BY Industry')
+        for col in STORE_COUNT_COLUMNS:
+            conn.execute(f'CREATE INDEX "idx_{store_view(col)}" ON data ("{col}", Industry, Company)')
+            conn.execute(f'CREATE VIEW "{store_view(col)}" AS '
+                         f'SELECT Industry, "{col}" AS value, COUNT(DISTINCT Company) AS companies '
+                         f'FROM data WHERE "{col}" IS NOT NULL GROUP BY "{col}", Industry')
+        conn.execute('ANALYZE')
+    conn.close()
+    os.replace(tmp_path, path)
+
+def main():
+    # Save the preprocessed data as CSV (for importing into Tableau), as a Parquet dataset and as an indexed store
+    df_expanded = load_preprocessed()
+    df_expanded.to_csv(DATA_PATH, index=False)
+    df = pd.read_csv(DATA_PATH)
+    write_dataset(df)
+    write_store(df)
+    print(f"Preprocessed {len(df_expanded)} rows into {DATA_PATH}, {DATASET_PATH} and {STORE_PATH}")
+
+if __name__ == '__main__':
+    main()
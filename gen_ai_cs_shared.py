@@ -0,0 +1,103 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Where published datasets live; /dev/shm keeps the mapped files in memory on Linux
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Integer-coded table mapped read-only by every worker process
+class SharedDataset:
+    """Handle to a table published as memory-mapped arrays
+
+    Text columns are stored as int32 codes into a lookup of their distinct values (one
+    UTF-8 blob and its offsets), integer columns as they are. Rows are grouped by industry
+    so that every industry is a contiguous segment. Pickling the handle only sends the
+    directory, column names and segment offsets, whatever the number of rows or distinct
+    values; workers map the arrays without copying.
+    """
+
+    def __init__(self, directory, columns, text_columns, segments, content_key):
+        self.directory = directory
+        self.columns = columns
+        self.text_columns = text_columns
+        self.segments = segments
+        self.content_key = content_key
+
+    @classmethod
+    def publish(cls, df, directory=SHARED_DIR):
+        """Code the table and write its columns once, returning the handle"""
+        content_key = hashlib.sha256(pd.util.hash_pandas_object(df).values.tobytes()).hexdigest()
+        directory = tempfile.mkdtemp(prefix='gen_ai_cs_shared_', dir=directory)
+
+        # Industries in order of appearance, each one's rows kept in their original order
+        industry_codes, industries = pd.factorize(df['Industry'])
+        order = np.argsort(industry_codes, kind='stable')
+        bounds = np.searchsorted(industry_codes[order], np.arange(len(industries) + 1))
+        segments = [(industry, int(start), int(stop)) for industry, start, stop in zip(industries, bounds[:-1], bounds[1:])]
+
+        text_columns = []
+        for position, col in enumerate(df.columns):
+            values = df[col].to_numpy()[order]
+            if pd.api.types.is_integer_dtype(df[col]):
+                np.save(os.path.join(directory, f'{position}.npy'), values)
+                continue
+            codes, uniques = pd.factorize(values)
+            encoded = [str(value).encode('utf-8') for value in uniques]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            np.save(os.path.join(directory, f'{position}.npy'), codes.astype(np.int32))
+            np.save(os.path.join(directory, f'{position}.lookup.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+            np.save(os.path.join(directory, f'{position}.offsets.npy'), offsets)
+            text_columns.append(col)
+        np.save(os.path.join(directory, 'rows.npy'), order)
+        return cls(directory, list(df.columns), text_columns, segments, content_key)
+
+    def _load(self, col, suffix=''):
+        return np.load(os.path.join(self.directory, f'{self.columns.index(col)}{suffix}.npy'), mmap_mode='r')
+
+    def array(self, col):
+        """Map a column's stored array read-only, without reading it"""
+        return self._load(col)
+
+    def decode(self, col, codes):
+        """Look up the text values of codes, reading only the distinct codes present (-1 is missing)"""
+        present, inverse = np.unique(codes, return_inverse=True)
+        lookup, offsets = self._load(col, '.lookup'), self._load(col, '.offsets')
+        values = np.array([np.nan if code < 0 else lookup[offsets[code]:offsets[code + 1]].tobytes().decode('utf-8')
+                           for code in present], dtype=object)
+        return values[inverse.ravel()]
+
+    def segment(self, segment_id, columns=None):
+        """Decode the rows of one industry segment into a DataFrame typed like pd.read_csv
+
+        Only the given columns (default: all of them) are read. Rows keep their position
+        in the published table as index, like a boolean selection of it.
+        """
+        _, start, stop = self.segments[segment_id]
+        data = {}
+        for col in columns or self.columns:
+            values = self.array(col)[start:stop]
+            if col in self.text_columns:
+                data[col] = pd.array(self.decode(col, values), dtype='str')
+            else:
+                data[col] = np.array(values)
+        rows = np.load(os.path.join(self.directory, 'rows.npy'), mmap_mode='r')[start:stop]
+        return pd.DataFrame(data, index=np.array(rows))
+
+    def segment_id(self, industry):
+        """Position of an industry's segment"""
+        return [name for name, _, _ in self.segments].index(industry)
+
+    def close(self):
+        """Remove the published files; handles already pickled to workers become invalid"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
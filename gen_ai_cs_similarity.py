@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from gen_ai_cs_cube import CATEGORY_COLUMNS, ATTRIBUTE_COLUMNS, connect_store
+from gen_ai_cs_preprocess import STORE_PATH
+from gen_ai_cs_pipeline import process_cores
+
+# Columns whose values make up a company's profile
+PROFILE_COLUMNS = ATTRIBUTE_COLUMNS + CATEGORY_COLUMNS
+
+# Number of most similar peers kept per company
+SIMILARITY_TOP_K = 5
+
+# Profiles compared against all candidate peers per matrix product; every thread holds a block
+# of SIMILARITY_BLOCK_ROWS x companies float32 scores and int64 sort keys (~150 MB for 50k companies)
+SIMILARITY_BLOCK_ROWS = 256
+
+# Similarity measures between two profiles, computed in place from their overlap and sizes
+def _jaccard(overlap, block_sizes, sizes):
+    union = block_sizes[:, None] + sizes[None, :]
+    union -= overlap
+    overlap /= union
+    return overlap
+
+def _cosine(overlap, block_sizes, sizes):
+    overlap /= np.sqrt(block_sizes[:, None] * sizes[None, :])
+    return overlap
+
+SIMILARITY_METRICS = {'jaccard': _jaccard, 'cosine': _cosine}
+
+# Distinct profile features of every company
+def profile_table(df):
+    """Return the distinct (Industry, Company, Feature) rows, a feature being '<column>: <value>'"""
+    long = df.melt(id_vars=['Industry', 'Company'], value_vars=PROFILE_COLUMNS, var_name='Column', value_name='Value')
+    long = long.dropna(subset=['Value'])
+    long['Feature'] = long['Column'] + ': ' + long['Value'].astype(str)
+    return long[['Industry', 'Company', 'Feature']].drop_duplicates(ignore_index=True)
+
+# Merge the profile tables of several shards
+def merge_profile_tables(*partials):
+    return pd.concat(partials, ignore_index=True).drop_duplicates(ignore_index=True)
+
+# Profile table queried from the store
+def store_profile_table(path=STORE_PATH):
+    """Return the same rows as profile_table, made distinct by the store's covering indexes"""
+    selects = ' UNION ALL '.join(f'SELECT DISTINCT Industry, Company, \'{col}: \' || "{col}" AS Feature '
+                                 f'FROM data WHERE "{col}" IS NOT NULL' for col in PROFILE_COLUMNS)
+    with connect_store(path) as conn:
+        table = pd.read_sql(selects, conn)
+    conn.close()
+    return table
+
+# Bit-packed multi-hot profile matrix
+def build_profiles(table):
+    """Pack every company's features into one bit per feature
+
+    Returns a dict with the 'companies' and their 'industries', the 'features', the
+    packed 'bits' (one row per company) and the 'sizes' (features per company).
+    """
+    company_codes, companies = pd.factorize(table['Company'], sort=True)
+    feature_codes, features = pd.factorize(table['Feature'], sort=True)
+    matrix = np.zeros((len(companies), len(features)), dtype=bool)
+    matrix[company_codes, feature_codes] = True
+    industries = table.drop_duplicates('Company').set_index('Company')['Industry'].reindex(companies)
+    return {
+        'companies': np.asarray(companies, dtype=object),
+        'industries': industries.to_numpy(dtype=object),
+        'features': list(features),
+        'bits': np.packbits(matrix, axis=1),
+        'sizes': matrix.sum(axis=1)
+    }
+
+# Unpack packed profile bits for matrix products
+def _unpack(bits, feature_count):
+    return np.unpackbits(bits, axis=1, count=feature_count).astype(np.float32)
+
+# Nearest peers of every company
+def top_peers(profiles, k=SIMILARITY_TOP_K, metric='jaccard', block_rows=SIMILARITY_BLOCK_ROWS, threads=None):
+    """Return each company's k most similar other companies as a long frame
+
+    Companies sharing a profile have the same scores, so scores are computed between the
+    distinct profiles only, and only the k + 1 alphabetically first companies of a profile
+    can be anyone's peers. Overlaps are computed for a block of profiles against all
+    candidates with one matrix product, so memory stays bounded by the block and no pair
+    is visited in Python; blocks run on threads (default: this process's share of the
+    cores). Peers without any shared feature are left out; ties go to the alphabetically
+    first company.
+    """
+    similarity = SIMILARITY_METRICS[metric]
+    n = len(profiles['companies'])
+    k = min(k, n - 1)
+    if k <= 0:
+        return pd.DataFrame(columns=['Company', 'Industry', 'Peer', 'Peer Industry', 'Similarity', 'Rank'])
+
+    patterns, pattern_of = np.unique(profiles['bits'], axis=0, return_inverse=True)
+    pattern_of = pattern_of.ravel()
+    matrix = _unpack(patterns, len(profiles['features']))
+    sizes = matrix.sum(axis=1)
+
+    # Candidate peers: the first k + 1 companies of every profile, one of them may be the company itself
+    by_pattern = np.argsort(pattern_of, kind='stable')
+    group_starts = np.searchsorted(pattern_of[by_pattern], pattern_of[by_pattern])
+    candidates = by_pattern[np.arange(n) - group_starts <= k]
+    candidate_matrix, candidate_sizes = matrix[pattern_of[candidates]], sizes[pattern_of[candidates]]
+    candidate_count = len(candidates)
+    # Complemented positions rank earlier companies first among equal scores
+    tie_breaks = n - 1 - candidates
+
+    # The k + 1 best candidates of every profile, best first
+    best = np.empty((len(patterns), k + 1), dtype=np.int64)
+    best_scores = np.empty((len(patterns), k + 1), dtype=np.float32)
+
+    def rank_block(start):
+        stop = min(start + block_rows, len(patterns))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            block = similarity(matrix[start:stop] @ candidate_matrix.T, sizes[start:stop], candidate_sizes)
+        # Profiles without features share nothing with anyone
+        block[sizes[start:stop] == 0] = 0
+        block[:, candidate_sizes == 0] = 0
+
+        # One sort key per candidate: non-negative float32 scores order like their bit patterns
+        keys = np.left_shift(block.view(np.int32), 32, dtype=np.int64)
+        keys |= tie_breaks
+        top = np.argpartition(keys, candidate_count - (k + 1), axis=1)[:, candidate_count - (k + 1):]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1), axis=1)
+        best[start:stop] = candidates[top]
+        best_scores[start:stop] = np.take_along_axis(block, top, axis=1)
+
+    with ThreadPoolExecutor(max_workers=threads or process_cores()) as executor:
+        list(executor.map(rank_block, range(0, len(patterns), block_rows)))
+
+    # Every company takes its profile's best candidates, itself excepted, k of them at most
+    peers, scores = best[pattern_of], best_scores[pattern_of]
+    keep = peers != np.arange(n)[:, None]
+    keep &= np.cumsum(keep, axis=1) <= k
+    peers, scores = peers[keep], scores[keep]
+    rows = np.repeat(np.arange(n), k)
+
+    result = pd.DataFrame({
+        'Company': profiles['companies'][rows],
+        'Industry': profiles['industries'][rows],
+        'Peer': profiles['companies'][peers],
+        'Peer Industry': profiles['industries'][peers],
+        'Similarity': scores,
+        'Rank': np.tile(np.arange(1, k + 1), n)
+    })
+    return result[result['Similarity'] > 0].reset_index(drop=True)
+
+# Peers of every company from its distinct profile rows
+def company_peers(table, k=SIMILARITY_TOP_K, metric='jaccard'):
+    return top_peers(build_profiles(table), k, metric)
@@ -0,0 +1,104 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Default relative standard error of approximate distinct counts
+SKETCH_RELATIVE_ERROR = 0.01
+
+# Hash bits below the register index that are searched for the leading one; 52 bits
+# convert to float64 exactly, and runs of more than 52 zeros practically never occur
+RANK_BITS = 52
+
+# Register index precision giving the requested relative standard error (1.04 / sqrt(2 ** p))
+def precision_for_error(relative_error):
+    """Return the smallest precision whose standard error is at most relative_error"""
+    precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+    if not 4 <= precision <= 18:
+        raise ValueError(f"Relative error {relative_error} needs an unsupported precision of {precision}")
+    return precision
+
+# Stable 64-bit hashes of values, identical across processes and runs
+def hash_values(values):
+    return pd.util.hash_pandas_object(pd.Series(values, dtype=object), index=False).values
+
+# Register index and rank of each hash
+def hash_registers(hashes, precision):
+    """Split 64-bit hashes into register indices (top bits) and ranks (position of the first one bit after them)"""
+    indices = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = (hashes << np.uint64(precision)) >> np.uint64(64 - RANK_BITS)
+    _, exponents = np.frexp(rest.astype(np.float64))
+    ranks = np.where(rest == 0, RANK_BITS + 1, RANK_BITS + 1 - exponents)
+    return indices, ranks.astype(np.uint8)
+
+# Mergeable approximate distinct counter
+class HyperLogLog:
+    """HyperLogLog sketch of a set of values
+
+    Sketches with the same precision merge by taking register-wise maxima, so partial
+    sketches from shards or earlier snapshots combine into the sketch of the union.
+    """
+
+    def __init__(self, precision, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    @classmethod
+    def from_values(cls, values, precision):
+        sketch = cls(precision)
+        indices, ranks = hash_registers(hash_values(values), precision)
+        np.maximum.at(sketch.registers, indices, ranks)
+        return sketch
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other):
+        """Return the sketch of the union of both sketched sets"""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge sketches of precision {self.precision} and {other.precision}")
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def estimate(self):
+        """Estimate the number of distinct values, with linear counting for small sets"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty > 0:
+            return m * math.log(m / empty)
+        return raw
+
+# Merge any number of sketches
+def merge_sketches(sketches):
+    sketches = iter(sketches)
+    merged = next(sketches)
+    for sketch in sketches:
+        merged = merged.merge(sketch)
+    return merged
+
+# Merge Series of sketches cell by cell
+def merge_sketch_series(series_list):
+    """Return one sketch per index value, merging the sketches every series holds for it"""
+    combined = pd.concat(series_list)
+    levels = list(range(combined.index.nlevels)) if combined.index.nlevels > 1 else 0
+    groups = combined.groupby(level=levels)
+    return pd.Series([merge_sketches(group) for _, group in groups], index=groups.size().index, dtype=object)
+
+# Sketch the distinct values of one column per group, all groups at once
+def grouped_sketches(df, group_cols, value_col, precision):
+    """Return a Series of HyperLogLog sketches of value_col indexed by the group_cols values"""
+    df = df.dropna(subset=group_cols)
+    grouped = df.groupby(group_cols)
+    keys = grouped.size().index
+
+    registers = np.zeros((len(keys), 1 << precision), dtype=np.uint8)
+    indices, ranks = hash_registers(hash_values(df[value_col]), precision)
+    np.maximum.at(registers, (grouped.ngroup().to_numpy(), indices), ranks)
+    return pd.Series([HyperLogLog(precision, row) for row in registers], index=keys, dtype=object)
+
+# Point estimates of a Series of sketches
+def estimate_counts(sketches):
+    """Round each sketch's estimate to a whole number of companies"""
+    return sketches.map(lambda sketch: int(round(sketch.estimate()))).astype('int64')
@@ -0,0 +1,163 @@
+import math
+from xml.sax.saxutils import escape
+
+from gen_ai_cs_images import artifact_path
+
+# Drawing units per inch; one unit is one point, so sizes match the matplotlib charts
+SVG_UNITS_PER_INCH = 72
+
+# Radius of the outermost grid ring, like the polar axes of a 14 inch matplotlib figure
+RADAR_RADIUS = 360
+
+# Font sizes of the spoke labels, radial tick labels, legend and title
+RADAR_LABEL_SIZE = 22
+RADAR_TICK_SIZE = 16
+RADAR_LEGEND_SIZE = 18
+RADAR_TITLE_SIZE = 22
+
+# Approximate advance of a character relative to the font size, used to fit the view box
+CHAR_WIDTH = 0.65
+
+# Target number of grid rings, like matplotlib's default radial locator
+RADAR_RINGS = 5
+
+# Margin kept around the drawn content, like savefig's pad_inches=0.1
+SVG_PAD = 0.1 * SVG_UNITS_PER_INCH
+
+# Break a category label over two lines
+def wrap_label(label):
+    """Break before '&' or 'and', or split labels longer than 20 characters into two halves of words"""
+    if ' & ' in label:
+        return label.replace(' & ', '\n& ')
+    if ' and ' in label:
+        return label.replace(' and ', '\nand ')
+    if len(label) > 20:
+        words = label.split()
+        mid_point = len(words) // 2
+        return f"{' '.join(words[:mid_point])}\n{' '.join(words[mid_point:])}"
+    return label
+
+# CSS colour of a matplotlib RGB tuple
+def svg_color(rgb):
+    return '#' + ''.join(f'{round(channel * 255):02x}' for channel in rgb)
+
+# Number formatting for coordinates, compact but precise enough for any zoom
+def _num(value):
+    text = f'{value:.2f}'.rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+# Evenly spaced grid values covering the largest value
+def radar_ticks(max_value, rings=RADAR_RINGS):
+    """Return ring values at a 1/2/2.5/5 x 10^k step from 0 up to at least max_value"""
+    if max_value <= 0:
+        return [0, 1]
+    raw_step = max_value / rings
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(factor * magnitude for factor in (1, 2, 2.5, 5, 10) if factor * magnitude >= raw_step)
+    count = math.ceil(max_value / step - 1e-9)
+    return [round(step * i, 12) for i in range(count + 1)]
+
+# Bounding box of everything drawn, grown element by element
+class _Extent:
+    def __init__(self):
+        self.left = self.top = math.inf
+        self.right = self.bottom = -math.inf
+
+    def add(self, left, top, right, bottom):
+        self.left, self.top = min(self.left, left), min(self.top, top)
+        self.right, self.bottom = max(self.right, right), max(self.bottom, bottom)
+
+    def add_text(self, x, y, lines, size, anchor, first_line_dy):
+        width = max(len(line) for line in lines) * size * CHAR_WIDTH
+        left = {'start': x, 'middle': x - width / 2, 'end': x - width}[anchor]
+        top = y + first_line_dy - 0.8 * size
+        self.add(left, top, left + width, top + 1.2 * size * len(lines))
+
+# Multi-line text element
+def _text(x, y, text, size, anchor, extent, first_line_dy=0.0, attrs=''):
+    lines = text.split('\n')
+    extent.add_text(x, y, lines, size, anchor, first_line_dy)
+    spans = ''.join(f'<tspan x="{_num(x)}" dy="{_num(first_line_dy if i == 0 else 1.2 * size)}">{escape(line)}</tspan>'
+                    for i, line in enumerate(lines))
+    return f'<text x="{_num(x)}" y="{_num(y)}" font-size="{size}" text-anchor="{anchor}"{attrs}>{spans}</text>'
+
+# Render a radar chart as SVG
+def radar_svg(labels, series, title=None):
+    """Return the SVG text of a radar chart
+
+    labels gives one spoke per category, counterclockwise from the right like matplotlib's
+    polar axes. series is a list of (name, values, rgb colour, line width, fill opacity)
+    tuples, each drawn as a filled polygon with markers and listed in the legend.
+    """
+    n = len(labels)
+    angles = [2 * math.pi * i / n for i in range(n)]
+    ticks = radar_ticks(max((max(values, default=0) for _, values, *_ in series), default=0))
+    scale = RADAR_RADIUS / ticks[-1]
+    extent = _Extent()
+    extent.add(-RADAR_RADIUS, -RADAR_RADIUS, RADAR_RADIUS, RADAR_RADIUS)
+
+    def point(angle, radius):
+        return radius * math.cos(angle), -radius * math.sin(angle)
+
+    parts = []
+
+    # Grid rings, spokes and the radial tick labels between the first two spokes
+    grid = ''.join(f'<circle r="{_num(tick * scale)}"/>' for tick in ticks[1:])
+    grid += ''.join('<line x2="{}" y2="{}"/>'.format(*map(_num, point(angle, RADAR_RADIUS))) for angle in angles)
+    parts.append(f'<g fill="none" stroke="#b0b0b0" stroke-width="0.8">{grid}</g>')
+    tick_angle = math.radians(22.5)
+    for tick in ticks[1:]:
+        x, y = point(tick_angle, tick * scale)
+        parts.append(_text(x, y, f'{tick:g}', RADAR_TICK_SIZE, 'start', extent))
+
+    # One filled polygon with markers per series
+    for name, values, color, line_width, fill_opacity in series:
+        points = [point(angle, value * scale) for angle, value in zip(angles, values)]
+        path = ' '.join(f'{_num(x)},{_num(y)}' for x, y in points)
+        hex_color = svg_color(color)
+        parts.append(f'<polygon points="{path}" fill="{hex_color}" fill-opacity="{fill_opacity}" stroke="{hex_color}" '
+                     f'stroke-width="{line_width}" stroke-linejoin="round"/>')
+        markers = ''.join(f'<circle cx="{_num(x)}" cy="{_num(y)}" r="{_num(2 * line_width)}"/>' for x, y in points)
+        parts.append(f'<g fill="{hex_color}">{markers}</g>')
+
+    # Spoke labels outside the outer ring, anchored away from the centre
+    for angle, label in zip(angles, labels):
+        lines = label.split('\n')
+        x, y = point(angle, RADAR_RADIUS + RADAR_LABEL_SIZE)
+        cos, sin = math.cos(angle), math.sin(angle)
+        anchor = 'start' if cos > 0.1 else 'end' if cos < -0.1 else 'middle'
+        # Centre the block of lines on the label position, pushed outwards at the top and bottom
+        block = 1.2 * RADAR_LABEL_SIZE * (len(lines) - 1)
+        first_line_dy = 0.35 * RADAR_LABEL_SIZE - block / 2 - sin * (block / 2 + 0.5 * RADAR_LABEL_SIZE)
+        parts.append(_text(x, y, label, RADAR_LABEL_SIZE, anchor, extent, first_line_dy, ' font-weight="bold"'))
+
+    # Legend in the upper right corner
+    legend_x = RADAR_RADIUS + 2 * RADAR_LABEL_SIZE
+    for position, (name, _, color, line_width, _) in enumerate(series):
+        y = -RADAR_RADIUS + position * 1.5 * RADAR_LEGEND_SIZE
+        hex_color = svg_color(color)
+        parts.append(f'<line x1="{_num(legend_x)}" y1="{_num(y)}" x2="{_num(legend_x + 40)}" y2="{_num(y)}" '
+                     f'stroke="{hex_color}" stroke-width="{line_width}"/>'
+                     f'<circle cx="{_num(legend_x + 20)}" cy="{_num(y)}" r="{_num(2 * line_width)}" fill="{hex_color}"/>')
+        parts.append(_text(legend_x + 50, y, name, RADAR_LEGEND_SIZE, 'start', extent, 0.35 * RADAR_LEGEND_SIZE))
+
+    if title:
+        y = extent.top - RADAR_TITLE_SIZE
+        parts.append(_text(0, y, title, RADAR_TITLE_SIZE, 'middle', extent, 0.0,
+                           f' font-weight="bold" fill="{svg_color(series[0][2])}"'))
+
+    left, top = extent.left - SVG_PAD, extent.top - SVG_PAD
+    width, height = extent.right - extent.left + 2 * SVG_PAD, extent.bottom - extent.top + 2 * SVG_PAD
+    view_box = ' '.join(map(_num, (left, top, width, height)))
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{view_box}" width="{_num(width)}pt" height="{_num(height)}pt" '
+            f'font-family="DejaVu Sans, Arial, sans-serif">'
+            f'<rect x="{_num(left)}" y="{_num(top)}" width="{_num(width)}" height="{_num(height)}" fill="#fff"/>'
+            f'{"".join(parts)}</svg>')
+
+# Write an SVG chart to the artifact store
+def save_svg(svg, name):
+    """Store the SVG text under name and return its artifact reference"""
+    ref = f'{name}.svg'
+    with open(artifact_path(ref), 'w', encoding='utf-8') as f:
+        f.write(svg)
+    return ref
@@ -0,0 +1,143 @@
+import argparse
+import os
+import time
+import traceback
+
+import pandas as pd
+
+import gen_ai_cs_analysis as analysis
+import gen_ai_cs_html as report
+from gen_ai_cs_sketch import SKETCH_RELATIVE_ERROR
+from gen_ai_cs_preprocess import WORKBOOK_PATH, DATA_PATH, load_preprocessed, write_dataset, write_store
+
+# Seconds between two checks of the watched files
+POLL_INTERVAL = 0.5
+
+# Quiet period after the last change before rebuilding, so that a save touching
+# the file several times (or the workbook and CSV together) triggers a single rebuild
+DEBOUNCE_SECONDS = 1.0
+
+# Modification signature of a watched file, None while it doesn't exist
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+# Long-lived builder keeping imports, fonts and the template warm between rebuilds
+class ReportBuilder:
+    """Rebuild the reports in-process through the analysis pipeline, whose checkpoints skip the stages
+    whose inputs did not change"""
+
+    def __init__(self, requested_focus_industries=None, workers=1, relative_error=None, renderer='matplotlib',
+                 cluster=False):
+        self.requested_focus_industries = requested_focus_industries
+        self.workers = workers
+        self.relative_error = relative_error
+        self.renderer = renderer
+        self.cluster = cluster
+        self.template = report.create_template()
+
+    def rebuild_from_workbook(self):
+        """Preprocess the workbook into the CSV, then rebuild from it"""
+        df_expanded = load_preprocessed(WORKBOOK_PATH)
+        df_expanded.to_csv(DATA_PATH, index=False)
+        return self.rebuild_from_csv()
+
+    def rebuild_from_csv(self):
+        """Refresh the Parquet dataset and the store from the CSV, then rebuild from it"""
+        # Reading the CSV back gives the data exactly the types the scripts work with
+        df = pd.read_csv(DATA_PATH)
+        write_dataset(df)
+        write_store(df)
+        return self.rebuild(df)
+
+    def rebuild(self, df):
+        """Rerun the stale stages for df and re-render the reports; returns the report file names"""
+        focus_industries = analysis.resolve_focus_industries(df['Industry'].unique(), self.requested_focus_industries)
+        results = analysis.run_analysis(df, focus_industries, workers=self.workers,
+                                        relative_error=self.relative_error, renderer=self.renderer,
+                                        cluster=self.cluster)
+
+        # Reports are always re-rendered, they are cheap compared to the charts
+        shared_insights = report.generate_insights(results['pair_tables'], results['cube'], results['peers'],
+                                                   results['combinations'])
+        return [report.render_report(self.template, focus_report, results['per_industry_spider_charts'],
+                                     results['heatmaps'], shared_insights)
+                for focus_report in results['focus_reports'].values()]
+
+# Watch the source files and rebuild the reports after they change
+def watch(builder, poll_interval=POLL_INTERVAL, debounce=DEBOUNCE_SECONDS):
+    """Poll the workbook and CSV, rebuilding after changes have settled for the debounce period"""
+    watched = [WORKBOOK_PATH, DATA_PATH]
+    signatures = {path: file_signature(path) for path in watched}
+    pending = set()
+    last_change = None
+
+    print(f"Watching {', '.join(watched)} for changes (Ctrl+C to stop)")
+    while True:
+        time.sleep(poll_interval)
+
+        for path in watched:
+            signature = file_signature(path)
+            if signature != signatures[path]:
+                signatures[path] = signature
+                pending.add(path)
+                last_change = time.monotonic()
+
+        if not pending or time.monotonic() - last_change < debounce:
+            continue
+
+        started = time.monotonic()
+        try:
+            # A workbook change regenerates the CSV, which covers any CSV change as well
+            if WORKBOOK_PATH in pending:
+                filenames = builder.rebuild_from_workbook()
+            else:
+                filenames = builder.rebuild_from_csv()
+        except Exception:
+            # Keep watching, the next save will most likely fix a half-edited input
+            traceback.print_exc()
+        else:
+            for filename in filenames:
+                print(f"Rebuilt {filename} in {time.monotonic() - started:.1f}s")
+
+        # The CSV written by the rebuild itself must not trigger another one
+        signatures[DATA_PATH] = file_signature(DATA_PATH)
+        pending.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the GenAI customer service reports whenever the source data changes')
+    parser.add_argument('--focus', action='append', dest='focus_industries', metavar='INDUSTRY',
+                        help=f'industry to build a deep-dive report for, repeatable; "all" for every industry (default: {analysis.DEFAULT_FOCUS_INDUSTRY})')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of stages run in parallel processes; 1 keeps every stage in the warm watcher process (default: 1)')
+    parser.add_argument('--approximate', nargs='?', type=float, const=SKETCH_RELATIVE_ERROR, metavar='ERROR',
+                        help=f'count companies with HyperLogLog sketches of the given relative error (default: {SKETCH_RELATIVE_ERROR})')
+    parser.add_argument('--radar', choices=analysis.RADAR_RENDERERS, default='matplotlib',
+                        help='draw the spider charts as matplotlib PNGs or write them directly as SVG (default: matplotlib)')
+    parser.add_argument('--cluster-heatmaps', action='store_true',
+                        help='order heatmap rows and columns so that similar category values are adjacent')
+    args = parser.parse_args()
+
+    os.makedirs('gen_ai_cs_viz', exist_ok=True)
+    builder = ReportBuilder(args.focus_industries, workers=args.workers, relative_error=args.approximate,
+                            renderer=args.radar, cluster=args.cluster_heatmaps)
+
+    # Initial build, from the workbook when the CSV is missing or older than it
+    workbook_signature, data_signature = file_signature(WORKBOOK_PATH), file_signature(DATA_PATH)
+    if data_signature is None or (workbook_signature is not None and workbook_signature[0] > data_signature[0]):
+        filenames = builder.rebuild_from_workbook()
+    else:
+        filenames = builder.rebuild_from_csv()
+    for filename in filenames:
+        print(f"HTML report generated successfully: {filename}")
+
+    try:
+        watch(builder)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+from itertools import combinations, product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gen_ai_cs_combinations import ALL_INDUSTRIES, closed_combinations, frequent_combinations
+from gen_ai_cs_cube import CATEGORY_COLUMNS
+from gen_ai_cs_similarity import profile_table
+
+# Small survey table with few codes per category, so that many combinations are frequent
+def toy_table(seed, companies=30):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for number in range(companies):
+        for _ in range(rng.integers(1, 4)):
+            rows.append({'Industry': f'Industry {number % 3}', 'Company': f'Company {number:02d}',
+                         'Contact_Party': 'B2C', 'Contact_Type': 'Inbound',
+                         **{col: int(rng.integers(1, 4)) for col in CATEGORY_COLUMNS}})
+    return profile_table(pd.DataFrame(rows))
+
+# Combinations with their company counts, enumerated company by company in pandas
+def brute_force_closed(table, min_support, min_companies):
+    items = table['Feature'].str.split(': ', n=1, expand=True)
+    items = table.assign(Column=items[0], Code=items[1])
+    items = items[items['Column'].isin(CATEGORY_COLUMNS)].astype({'Code': 'int64'})
+
+    rows = []
+    for (industry, company), group in items.groupby(['Industry', 'Company']):
+        codes = group.groupby('Column')['Code'].unique()
+        for size in range(1, len(codes) + 1):
+            for columns in combinations(sorted(codes.index, key=CATEGORY_COLUMNS.index), size):
+                for picked in product(*(sorted(codes[column]) for column in columns)):
+                    rows.append((industry, company, tuple(zip(columns, picked))))
+    found = pd.DataFrame(rows, columns=['Industry', 'Company', 'Items'])
+    found = pd.concat([found, found.assign(Industry=ALL_INDUSTRIES)])
+
+    companies = items.drop_duplicates('Company')['Industry'].value_counts()
+    companies[ALL_INDUSTRIES] = companies.sum()
+    counts = found.groupby(['Industry', 'Items']).size().rename('Companies').reset_index()
+    min_counts = np.maximum(min_companies, np.ceil(min_support * counts['Industry'].map(companies)))
+    frequent = counts[counts['Companies'] >= min_counts]
+
+    # Closed: no larger combination of the same industry holds the same companies
+    closed = set()
+    for row in frequent.itertuples():
+        supersets = frequent[(frequent['Industry'] == row.Industry) & (frequent['Companies'] == row.Companies)]
+        if not any(set(row.Items) < set(other) for other in supersets['Items']):
+            closed.add((row.Industry, row.Items, row.Companies))
+    return closed
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('min_support', [0.15, 0.35])
+def test_closed_combinations_match_brute_force(seed, min_support):
+    table = toy_table(seed)
+    mined = closed_combinations(frequent_combinations(table, min_support=min_support, min_companies=2))
+    assert set(zip(mined['Industry'], mined['Items'], mined['Companies'])) == brute_force_closed(table, min_support, 2)
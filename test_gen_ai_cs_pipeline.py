@@ -0,0 +1,155 @@
+import importlib
+import sys
+from functools import partial
+
+import pytest
+
+import gen_ai_cs_pipeline as pipeline
+from gen_ai_cs_pipeline import Stage, code_key, load_checkpoint, project_modules, run_pipeline, save_checkpoint
+
+HELPER_SOURCE = '''
+SCALE = {scale}
+
+def scale(value):
+    return value * SCALE
+'''
+
+STAGES_SOURCE = '''
+from pipeline_test_helper import scale
+
+CALLS = []
+
+class Result:
+    pass
+
+def scaled(value):
+    CALLS.append('scaled')
+    return scale(value)
+
+def parity(value):
+    CALLS.append('parity')
+    return value % 2
+
+def total(*values):
+    CALLS.append('total')
+    return sum(values)
+'''
+
+# Stage functions defined in a throwaway project whose helper module can be edited
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    def write_helper(scale):
+        (tmp_path / 'pipeline_test_helper.py').write_text(HELPER_SOURCE.format(scale=scale))
+        # A new run starts with no source hashes cached and the edited helper imported
+        monkeypatch.setattr(pipeline, '_source_keys', {})
+        sys.modules.pop('pipeline_test_helper', None)
+        sys.modules.pop('pipeline_test_stages', None)
+        importlib.invalidate_caches()
+        return importlib.import_module('pipeline_test_stages')
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / 'pipeline_test_stages.py').write_text(STAGES_SOURCE)
+    yield write_helper
+    sys.modules.pop('pipeline_test_helper', None)
+    sys.modules.pop('pipeline_test_stages', None)
+
+def stages_of(module):
+    return [
+        Stage('a', module.scaled, ['x']),
+        Stage('b', module.scaled, ['y']),
+        Stage('sum', module.total, ['a', 'b'])
+    ]
+
+def test_runs_stages_in_dependency_order(project, tmp_path):
+    module = project(scale=2)
+    values = run_pipeline(stages_of(module), {'x': 1, 'y': 3}, workers=1, checkpoint_dir=tmp_path / 'checkpoints')
+    assert values['sum'] == 8
+    assert module.CALLS[-1] == 'total'
+
+def test_unchanged_stages_come_from_checkpoints(project, tmp_path):
+    checkpoint_dir = tmp_path / 'checkpoints'
+    module = project(scale=2)
+    run_pipeline(stages_of(module), {'x': 1, 'y': 3}, workers=1, checkpoint_dir=checkpoint_dir)
+    module.CALLS.clear()
+
+    values = run_pipeline(stages_of(module), {'x': 1, 'y': 5}, workers=1, checkpoint_dir=checkpoint_dir)
+    assert values['sum'] == 12
+    assert module.CALLS == ['scaled', 'total']
+
+def test_stages_after_unchanged_outputs_are_not_rerun(project, tmp_path):
+    checkpoint_dir = tmp_path / 'checkpoints'
+    module = project(scale=2)
+    stages = [Stage('odd', module.parity, ['x']), Stage('sum', module.total, ['odd'])]
+    run_pipeline(stages, {'x': 1}, workers=1, checkpoint_dir=checkpoint_dir)
+    module.CALLS.clear()
+
+    values = run_pipeline(stages, {'x': 3}, workers=1, checkpoint_dir=checkpoint_dir)
+    assert values['sum'] == 1
+    assert module.CALLS == ['parity']
+
+def test_code_key_covers_imported_project_modules(project, tmp_path):
+    module = project(scale=2)
+    assert project_modules(module) == sorted([str(tmp_path / 'pipeline_test_helper.py'),
+                                              str(tmp_path / 'pipeline_test_stages.py')])
+    key = code_key(module.scaled)
+    assert code_key(partial(module.scaled)) != key
+
+    module = project(scale=3)
+    assert code_key(module.scaled) != key
+
+def test_helper_change_invalidates_checkpoints(project, tmp_path):
+    checkpoint_dir = tmp_path / 'checkpoints'
+    module = project(scale=2)
+    run_pipeline(stages_of(module), {'x': 1, 'y': 3}, workers=1, checkpoint_dir=checkpoint_dir)
+
+    module = project(scale=3)
+    values = run_pipeline(stages_of(module), {'x': 1, 'y': 3}, workers=1, checkpoint_dir=checkpoint_dir)
+    assert values['sum'] == 12
+    assert sorted(module.CALLS) == ['scaled', 'scaled', 'total']
+
+def test_stage_names_do_not_share_checkpoints(project, tmp_path):
+    module = project(scale=2)
+    stages = [Stage('shard:/tmp/a.csv', module.scaled, ['x']), Stage('shard:/tmp_a.csv', module.scaled, ['y'])]
+    run_pipeline(stages, {'x': 1, 'y': 3}, workers=1, checkpoint_dir=tmp_path)
+    module.CALLS.clear()
+
+    values = run_pipeline(stages, {'x': 1, 'y': 3}, workers=1, checkpoint_dir=tmp_path)
+    assert (values['shard:/tmp/a.csv'], values['shard:/tmp_a.csv']) == (2, 6)
+    assert module.CALLS == []
+
+def test_checkpoints_that_no_longer_unpickle_are_stale(project, tmp_path):
+    module = project(scale=2)
+    stage = Stage('a', module.scaled, ['x'])
+    save_checkpoint(tmp_path, stage, 'key', (module.Result(),))
+    assert isinstance(load_checkpoint(tmp_path, stage, 'key')[0], module.Result)
+
+    # The class of the checkpointed output was renamed
+    del module.Result
+    assert load_checkpoint(tmp_path, stage, 'key') is None
+
+def test_local_stages_run_in_the_calling_process(project, tmp_path):
+    module = project(scale=2)
+    values = run_pipeline([Stage('a', module.scaled, ['x'], local=True)], {'x': 1}, workers=2, checkpoint_dir=tmp_path)
+    assert values['a'] == 2
+    assert module.CALLS == ['scaled']
+
+def test_rejects_unknown_inputs_and_cycles(project, tmp_path):
+    module = project(scale=2)
+    with pytest.raises(ValueError, match='unknown inputs'):
+        run_pipeline([Stage('a', module.scaled, ['missing'])], {}, workers=1, checkpoint_dir=tmp_path)
+    with pytest.raises(ValueError, match='cycle'):
+        run_pipeline([Stage('a', module.total, ['b']), Stage('b', module.total, ['a'])], {},
+                     workers=1, checkpoint_dir=tmp_path)
+
+def test_stage_errors_are_raised(project, tmp_path):
+    module = project(scale=2)
+    with pytest.raises(TypeError):
+        run_pipeline([Stage('a', module.scaled, ['x'])], {'x': None}, workers=1, checkpoint_dir=tmp_path)
+
+def test_pool_workers_share_the_cores(monkeypatch):
+    monkeypatch.setattr(pipeline.os, 'cpu_count', lambda: 8)
+    assert pipeline.process_cores() == 8
+    monkeypatch.setattr(pipeline, 'POOL_WORKERS', 4)
+    assert pipeline.process_cores() == 2
+    monkeypatch.setattr(pipeline, 'POOL_WORKERS', 16)
+    assert pipeline.process_cores() == 1
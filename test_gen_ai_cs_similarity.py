@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gen_ai_cs_similarity import build_profiles, profile_table, top_peers
+
+# Small survey table whose companies often share a profile, so that scores tie
+def toy_table(seed, companies=40):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for number in range(companies):
+        company = f'Company {number:02d}'
+        industry = f'Industry {number % 3}'
+        if number >= 4 and rng.random() < 0.5:
+            # Same answers as an earlier company
+            source = f'Company {rng.integers(number):02d}'
+            rows += [{**row, 'Industry': industry, 'Company': company} for row in rows if row['Company'] == source]
+            continue
+        for _ in range(rng.integers(1, 4)):
+            rows.append({'Industry': industry, 'Company': company,
+                         'Contact_Party': rng.choice(['B2B', 'B2C']), 'Contact_Type': rng.choice(['Inbound', 'Outbound']),
+                         **{f'Cat {cat_num}': int(rng.integers(1, 4)) for cat_num in range(1, 5)}})
+    return profile_table(pd.DataFrame(rows))
+
+# Peers from every pair of companies, scored in pandas
+def brute_force_peers(table, k, metric):
+    sizes = table.groupby('Company').size()
+    pairs = table.merge(table, on='Feature', suffixes=('', ' Peer'))
+    pairs = pairs[pairs['Company'] != pairs['Company Peer']]
+    overlap = pairs.groupby(['Company', 'Company Peer']).size().rename('Overlap').reset_index()
+    size, peer_size = overlap['Company'].map(sizes), overlap['Company Peer'].map(sizes)
+    if metric == 'jaccard':
+        overlap['Similarity'] = overlap['Overlap'] / (size + peer_size - overlap['Overlap'])
+    else:
+        overlap['Similarity'] = overlap['Overlap'] / np.sqrt(size * peer_size)
+    overlap = overlap.sort_values(['Company', 'Similarity', 'Company Peer'], ascending=[True, False, True])
+    top = overlap.groupby('Company').head(k).rename(columns={'Company Peer': 'Peer'})
+    top['Rank'] = top.groupby('Company').cumcount() + 1
+    return top[['Company', 'Peer', 'Rank', 'Similarity']].reset_index(drop=True)
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('k', [2, 5])
+@pytest.mark.parametrize('block_rows', [1, 7, 256])
+def test_top_peers_match_brute_force(seed, k, block_rows):
+    table = toy_table(seed)
+    expected = brute_force_peers(table, k, 'jaccard')
+    peers = top_peers(build_profiles(table), k, 'jaccard', block_rows, threads=2)
+    assert peers[['Company', 'Peer', 'Rank']].equals(expected[['Company', 'Peer', 'Rank']])
+    np.testing.assert_allclose(peers['Similarity'], expected['Similarity'], rtol=1e-6)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_cosine_scores_match_brute_force(seed):
+    # Equal cosine scores may differ in their last bit, so only the scores are compared
+    table = toy_table(seed)
+    expected = brute_force_peers(table, 5, 'cosine')
+    peers = top_peers(build_profiles(table), 5, 'cosine', block_rows=7)
+    assert peers[['Company', 'Rank']].equals(expected[['Company', 'Rank']])
+    np.testing.assert_allclose(peers['Similarity'], expected['Similarity'], rtol=1e-6)
+
+def test_peers_of_industries_are_listed_with_the_companies():
+    table = toy_table(0)
+    industries = table.drop_duplicates('Company').set_index('Company')['Industry']
+    peers = top_peers(build_profiles(table), 3)
+    assert (peers['Industry'] == peers['Company'].map(industries)).all()
+    assert (peers['Peer Industry'] == peers['Peer'].map(industries)).all()